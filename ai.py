@@ -1,11 +1,35 @@
-from collections import defaultdict
 import random
 import numpy as np
+from candidates import CandidateMoves
+from checkpoint import FLAG_CANONICAL, load_orientations, load_q_table, save_q_table
+from qtable import BoundedQTable
+from replay import ReplayBuffer, n_step_returns
+from stats import RingBuffer
+from symmetry import BoardSymmetry
+from zobrist import ZobristHasher
 
 class QLearningAI:
-    def __init__(self, player):
+    def __init__(self, player, seed=None, check_collisions=False, canonicalize=False,
+                 candidate_radius=None, history=1000, q_table_budget_mb=None, eviction='lru',
+                 replay_capacity=None, replay_batch_size=64, replay_batches=4, n_step=None,
+                 opening_book=None):
         self.player = player  # 1 for black, 2 for white
-        self.q_table = defaultdict(float)  # Stores Q-values for state-action pairs
+        self.rng = random.Random(seed)  # Per-agent RNG so seeded runs are reproducible
+        self.hasher = ZobristHasher()  # Same seed as the environment, so keys agree
+        self.check_collisions = check_collisions  # Verify that no two boards share a key
+        self.key_boards = {}  # Key -> board bytes, only filled when check_collisions is on
+        self.hash_collisions = 0
+        # Optionally share one Q-table row between all 8 rotations/reflections of a board
+        self.canonicalize = canonicalize
+        self.symmetry = BoardSymmetry() if canonicalize else None
+        self.orientations = {}  # Canonical key -> bitmask of orientations learned from
+        # Optionally only consider empty cells within candidate_radius of a stone
+        self.candidate_radius = candidate_radius
+        self.candidates = CandidateMoves(radius=candidate_radius) if candidate_radius else None
+        # State key -> float32 array of Q-values, one per board cell; optionally memory-capped
+        self.q_table_budget_mb = q_table_budget_mb
+        self.eviction = eviction
+        self.q_table = self.new_q_table()
         self.learning_rate = 0.1  # How much new info overrides old
         self.discount_factor = 0.9  # Importance of future rewards
         self.exploration_rate = 0.45  # Initial exploration probability
@@ -18,55 +42,144 @@ class QLearningAI:
         self.draws = 0  # Total draws
         self.q_values = []  # Tracks Q-values during gameplay
         self.rewards = []  # Tracks rewards received
-        self.max_q_per_game = []  # Tracks maximum Q-value per game
-        self.final_rewards = []  # Tracks final rewards per game
+        self.max_q_per_game = RingBuffer(history)  # Tracks maximum Q-value of the last `history` games
+        self.final_rewards = RingBuffer(history)  # Tracks final rewards of the last `history` games
+        
+        # Optional experience replay: learn() only records the game's transitions, and at the
+        # end of the game they are applied in one backward n-step sweep, stored in the replay
+        # buffer, and followed by replay_batches minibatch updates sampled from the buffer
+        n_actions = self.hasher.board_size ** 2
+        self.replay = ReplayBuffer(replay_capacity, n_actions) if replay_capacity else None
+        self.replay_batch_size = replay_batch_size
+        self.replay_batches = replay_batches
+        self.n_step = n_step  # None = full return to the end of the game
+        self.replay_rng = np.random.default_rng(seed)
+        self.episode = []  # [table key, table action, reward, table-frame move mask] per move
+        self.decision_mask = None  # Moves considered by the latest choose_action
+        self.opening_book = opening_book  # Optional OpeningBook consulted before the Q-table
+        self.book_hits = 0
+
+    def new_q_table(self):
+        """Create an empty Q-table, bounded by q_table_budget_mb when it is set."""
+        if self.q_table_budget_mb is None:
+            return {}
+        return BoundedQTable(
+            self.q_table_budget_mb * 2**20, self.hasher.board_size ** 2,
+            policy=self.eviction, seed=self.rng.getrandbits(32), on_evict=self.forget_state
+        )
+
+    def forget_state(self, state_key):
+        """Drop per-state bookkeeping for a state evicted from the Q-table."""
+        self.orientations.pop(state_key, None)
+        self.key_boards.pop(state_key, None)
+
+    def q_table_metrics(self):
+        """Q-table size and, for bounded tables, hit rate and evictions."""
+        if hasattr(self.q_table, 'metrics'):
+            return self.q_table.metrics()
+        row_bytes = self.hasher.board_size ** 2 * np.dtype(np.float32).itemsize
+        return {'entries': len(self.q_table), 'bytes': len(self.q_table) * row_bytes}
+
+    def get_state_key(self, board, env=None):
+        """
+        Return the 64-bit Zobrist key of the board for Q-table lookup.
+        Uses the key the environment maintains incrementally when env is given,
+        otherwise hashes the board from scratch.
+        When canonicalizing, returns (canonical key, symmetry index) instead.
+        """
+        if self.canonicalize:
+            keys = env.get_symmetry_keys() if env is not None else self.symmetry.board_keys(board, self.hasher)
+            state_key = self.symmetry.canonical(keys)
+            table_key = state_key[0]
+        else:
+            state_key = env.state_key if env is not None else self.hasher.hash_board(board)
+            table_key = state_key
+        
+        if self.check_collisions:
+            if self.canonicalize:
+                board = self.symmetry.to_canonical_board(board, state_key[1])
+            board_bytes = np.asarray(board, dtype=np.int8).tobytes()
+            if self.key_boards.setdefault(table_key, board_bytes) != board_bytes:
+                self.hash_collisions += 1
+        
+        return state_key
 
-    def get_state_key(self, board):
-        """Convert the board state to a string key for Q-table lookup."""
-        return str(board.flatten().tolist())
+    def get_q_row(self, state_key):
+        """Return the state's Q-values indexed by board cell, or None if unseen."""
+        if self.canonicalize:
+            table_key, symmetry = state_key
+            q_row = self.q_table.get(table_key)
+            # Gather from the canonical frame back into the board's own orientation
+            return None if q_row is None else q_row[self.symmetry.perms[symmetry]]
+        return self.q_table.get(state_key)
 
     def get_available_moves(self, board):
         """Get all valid moves (empty positions) on the current board."""
-        moves = []
-        for y in range(board.shape[0]):
-            for x in range(board.shape[1]):
-                if board[y][x] == 0:
-                    moves.append((y, x))
-        return moves
+        return [divmod(int(i), board.shape[1]) for i in np.flatnonzero(board.ravel() == 0)]
+
+    def get_legal_mask(self, board, env=None):
+        """
+        Flat boolean mask of the moves to consider: all empty cells, or only the
+        candidate cells near existing stones when candidate_radius is set.
+        Taken from the environment's incrementally updated masks when available.
+        """
+        if self.candidates is None:
+            return env.legal_mask if env is not None else board.ravel() == 0
+        if env is not None and env.candidates.radius == self.candidate_radius:
+            return env.get_candidate_mask()
+        return self.candidates.mask_for_board(board)
 
-    def choose_action(self, board):
+    def choose_action(self, board, env=None):
         """
         Choose an action using ε-greedy policy.
         With probability ε, explore randomly; otherwise exploit best known action.
         """
-        state_key = self.get_state_key(board)
-        available_moves = self.get_available_moves(board)
+        state_key = self.get_state_key(board, env)
+        legal = self.get_legal_mask(board, env)
+        if self.candidates is None and env is not None:
+            available = env.free_cells
+        else:
+            available = np.flatnonzero(legal)
         
-        if not available_moves:
+        if len(available) == 0:
             return None
+        if self.replay is not None:
+            self.decision_mask = legal.copy()
         
         # Exploration: choose random action
-        if random.random() < self.exploration_rate:
-            return random.choice(available_moves)
+        if self.rng.random() < self.exploration_rate:
+            return divmod(int(self.rng.choice(available)), board.shape[1])
         
-        # Exploitation: choose best known action
-        best_move = None
-        max_q_value = -float('inf')
+        # Exploitation: an opening book move if the position is in the book
+        if self.opening_book is not None:
+            move = self.opening_book.lookup(board, env)
+            if move is not None and legal[move[0] * board.shape[1] + move[1]]:
+                self.book_hits += 1
+                return move
         
-        for move in available_moves:
-            action_key = str(move)
-            q_value = self.q_table.get((state_key, action_key), 0.0)
-            if q_value > max_q_value:
-                max_q_value = q_value
-                best_move = move
+        # Otherwise the best known action (first empty cell wins ties)
+        q_row = self.get_q_row(state_key)
+        if q_row is None:
+            best_action = int(legal.argmax())  # First empty cell
+            max_q_value = 0.0
+        else:
+            masked_q = np.where(legal, q_row, -np.inf)
+            best_action = int(masked_q.argmax())
+            max_q_value = float(masked_q[best_action])
         
         # Track the maximum Q-value for the current state
-        if max_q_value != -float('inf'):
-            self.q_values.append(max_q_value)
+        self.q_values.append(max_q_value)
         
-        return best_move if best_move is not None else random.choice(available_moves)
+        return divmod(int(best_action), board.shape[1])
+
+    def observe_action(self, board, move, env=None):
+        """Take a move chosen elsewhere (e.g. read from a game log) as this agent's decision."""
+        self.last_state = self.get_state_key(board, env)
+        self.last_action = move
+        if self.replay is not None:
+            self.decision_mask = self.get_legal_mask(board, env).copy()
 
-    def learn(self, board, reward):
+    def learn(self, board, reward, env=None):
         """
         Update Q-values using the Q-learning algorithm.
         Q(s,a) = Q(s,a) + α[r + γ*max(Q(s',a')) - Q(s,a)]
@@ -75,26 +188,28 @@ class QLearningAI:
             return
         
         old_state_key = self.last_state
-        action_key = str(self.last_action)
-        new_state_key = self.get_state_key(board)
-        
-        # Calculate maximum Q-value for the new state
-        max_q_new = 0.0
-        available_moves = self.get_available_moves(board)
-        if available_moves:
-            max_q_new = max(
-                [self.q_table.get((new_state_key, str(move)), 0.0) 
-                 for move in available_moves]
-            )
+        action = self.last_action[0] * board.shape[1] + self.last_action[1]
         
-        # Q-learning update rule
-        old_q_value = self.q_table.get((old_state_key, action_key), 0.0)
-        new_q_value = old_q_value + self.learning_rate * (
-            reward + self.discount_factor * max_q_new - old_q_value
-        )
-        
-        # Update Q-table
-        self.q_table[(old_state_key, action_key)] = new_q_value
+        if self.replay is not None:
+            self.record_transition(old_state_key, action, reward)
+        else:
+            new_state_key = self.get_state_key(board, env)
+            
+            # Calculate maximum Q-value for the new state over its empty cells
+            max_q_new = 0.0
+            new_q_row = self.get_q_row(new_state_key)
+            if new_q_row is not None:
+                legal = self.get_legal_mask(board, env)
+                if legal.any():
+                    max_q_new = float(new_q_row[legal].max())
+            
+            # Q-learning update rule, in the frame the Q-table row is stored in
+            table_key, action, _ = self.to_table_frame(old_state_key, action)
+            q_row = self.table_row(table_key, self.orientation_bit(old_state_key))
+            old_q_value = float(q_row[action])
+            q_row[action] = old_q_value + self.learning_rate * (
+                reward + self.discount_factor * max_q_new - old_q_value
+            )
         self.rewards.append(reward)
         
         # Decay exploration rate with lower bound
@@ -103,8 +218,143 @@ class QLearningAI:
             self.exploration_rate * self.exploration_decay
         )
 
+    def to_table_frame(self, state_key, action, mask=None):
+        """
+        Map a state key, flat action and optional move mask into the frame the
+        Q-table row is stored in. Returns (table key, table action, table mask).
+        """
+        if not self.canonicalize:
+            return state_key, action, mask
+        table_key, symmetry = state_key
+        perm = self.symmetry.perms[symmetry]
+        table_mask = None
+        if mask is not None:
+            table_mask = np.empty_like(mask)
+            table_mask[perm] = mask
+        return table_key, int(perm[action]), table_mask
+
+    def orientation_bit(self, state_key):
+        """Bit of the orientation a state key was seen in (0 when not canonicalizing)."""
+        return 1 << state_key[1] if self.canonicalize else 0
+
+    def table_row(self, table_key, orientation=0):
+        """
+        Return the Q-table row stored under table_key, creating a zero row if it is
+        missing, and record the orientation bits it is being learned from.
+        """
+        q_row = self.q_table.get(table_key)
+        if q_row is None:
+            q_row = self.q_table[table_key] = np.zeros(self.hasher.board_size ** 2, dtype=np.float32)
+        if orientation:
+            self.orientations[table_key] = self.orientations.get(table_key, 0) | orientation
+        return q_row
+
+    def record_transition(self, state_key, action, reward):
+        """Remember one move of the current game for the end-of-game replay updates."""
+        if self.decision_mask is None:
+            # A second learn() for the same move carries the game's outcome
+            if self.episode:
+                self.episode[-1][2] = reward
+            return
+        table_key, table_action, table_mask = self.to_table_frame(state_key, action, self.decision_mask)
+        self.episode.append([table_key, table_action, reward, table_mask, self.orientation_bit(state_key)])
+        self.decision_mask = None
+
+    def replay_episode(self):
+        """
+        Turn the finished game into n-step transitions, bootstrapping from this
+        agent's own later decision states. They are applied newest first, so the
+        final win/loss reward reaches the opening moves in a single sweep, then
+        added to the replay buffer and followed by sampled minibatch updates.
+        """
+        length = len(self.episode)
+        keys = np.array([t[0] for t in self.episode], dtype=np.uint64)
+        actions = np.array([t[1] for t in self.episode], dtype=np.intp)
+        masks = np.array([t[3] for t in self.episode], dtype=bool)
+        orientations = np.array([t[4] for t in self.episode], dtype=np.uint8)
+        returns, offsets = n_step_returns([t[2] for t in self.episode], self.discount_factor, self.n_step)
+        dones = offsets >= length
+        next_index = np.minimum(offsets, length - 1)
+        discounts = self.discount_factor ** (offsets - np.arange(length))
+        transitions = (keys, actions, returns.astype(np.float32), keys[next_index],
+                       masks[next_index], discounts.astype(np.float32), dones, orientations)
+        
+        self.apply_updates(*(field[::-1] for field in transitions), sequential=True)
+        self.replay.add_batch(*transitions)
+        for _ in range(self.replay_batches):
+            self.apply_updates(*self.replay.sample(self.replay_batch_size, self.replay_rng))
+        self.episode = []
+
+    def apply_updates(self, state_keys, actions, returns, next_keys, next_masks, discounts, dones,
+                      orientations, sequential=False):
+        """
+        Apply n-step Q-learning updates for a batch of transitions:
+        Q(s,a) += α[G + γⁿ*max(Q(s',a')) - Q(s,a)]
+        Batched updates compute all targets from the current table in one vector
+        pass, and transitions sharing a state add up their changes; sequential
+        updates let each target see the previous updates.
+        """
+        n_actions = next_masks.shape[1]
+        # Insert every row before writing any update. A bounded table keeps the batch's
+        # keys pinned meanwhile, so inserting one row can't evict another we hold
+        bounded = isinstance(self.q_table, BoundedQTable)
+        if bounded:
+            self.q_table.pin(state_keys.tolist())
+        rows = [self.table_row(key, orientation)
+                for key, orientation in zip(state_keys.tolist(), orientations.tolist())]
+        if bounded:
+            self.q_table.unpin()
+        
+        if sequential:
+            for q_row, action, ret, next_key, mask, discount, done in zip(
+                    rows, actions, returns, next_keys.tolist(), next_masks, discounts, dones):
+                target = float(ret)
+                next_row = None if done else self.q_table.get(next_key)
+                if next_row is not None and mask.any():
+                    target += float(discount) * float(next_row[mask].max())
+                q_row[action] += self.learning_rate * (target - q_row[action])
+            return
+        
+        zeros = np.zeros(n_actions, dtype=np.float32)
+        next_rows = np.stack([
+            zeros if done else self.q_table.get(key, zeros)
+            for key, done in zip(next_keys.tolist(), dones)
+        ])
+        next_values = np.where(next_masks, next_rows, -np.inf).max(axis=1)
+        next_values[~np.isfinite(next_values) | dones] = 0.0
+        targets = returns + discounts * next_values
+        old_values = np.array([q_row[action] for q_row, action in zip(rows, actions)])
+        deltas = self.learning_rate * (targets - old_values)
+        # Sum the changes per (state, action) with np.add.at, so duplicates all count
+        _, first, inverse = np.unique(state_keys, return_index=True, return_inverse=True)
+        row_deltas = np.zeros((len(first), n_actions), dtype=np.float32)
+        np.add.at(row_deltas, (inverse, actions), deltas)
+        for i, row_delta in zip(first.tolist(), row_deltas):
+            rows[i] += row_delta
+
+    def symmetry_savings(self):
+        """
+        Report how much canonicalization shrank the Q-table: the number of stored
+        rows against the number of distinct board orientations they stand for.
+        Returns None when some rows have no orientation record (e.g. tables
+        loaded from checkpoints written without one, or merged from workers).
+        """
+        canonical_states = len(self.q_table)
+        if len(self.orientations) != canonical_states:
+            return None
+        raw_states = sum(bin(mask).count('1') for mask in self.orientations.values())
+        return {
+            'canonical_states': canonical_states,
+            'raw_states': raw_states,
+            'ratio': raw_states / max(1, canonical_states),
+        }
+
     def reset(self):
         """Reset the agent's temporary state between games."""
+        if self.replay is not None and self.episode:
+            self.replay_episode()
+        self.decision_mask = None
+        
         if self.q_values:  # Only store if we have values
             self.max_q_per_game.append(max(self.q_values))
         
@@ -115,4 +365,41 @@ class QLearningAI:
         self.last_state = None
         self.last_action = None
         self.q_values = []
-        self.rewards = []  # Clear rewards for next game
\ No newline at end of file
+        self.rewards = []  # Clear rewards for next game
+
+    def save(self, path):
+        """Save the Q-table and learning progress to a binary checkpoint file."""
+        save_q_table(
+            path, self.q_table, self.hasher.board_size ** 2,
+            orientations=self.orientations if self.canonicalize else None,
+            player=self.player,
+            flags=FLAG_CANONICAL if self.canonicalize else 0,
+            wins=self.wins,
+            losses=self.losses,
+            draws=self.draws,
+            exploration_rate=self.exploration_rate,
+        )
+
+    def load(self, path, mmap=True):
+        """
+        Restore the Q-table and learning progress from a checkpoint file.
+        With mmap the table is memory-mapped rather than read, so loading is
+        near-instant and processes serving the same file share its pages.
+        """
+        q_table, header = load_q_table(path, mmap=mmap)
+        if bool(header['flags'] & FLAG_CANONICAL) != self.canonicalize:
+            raise ValueError(f"{path} was saved with canonicalize={not self.canonicalize}")
+        if self.canonicalize:
+            # Before the rows, so rows evicted while streaming drop their records via forget_state
+            self.orientations = load_orientations(path, header) or {}
+        if self.q_table_budget_mb is not None:
+            # Stream the checkpoint into a bounded table; the oldest rows are evicted if it is too big
+            self.q_table = self.new_q_table()
+            for key, row in q_table.items():
+                self.q_table[key] = np.array(row)
+        else:
+            self.q_table = q_table
+        self.exploration_rate = float(header['exploration_rate'])
+        self.wins = int(header['wins'])
+        self.losses = int(header['losses'])
+        self.draws = int(header['draws'])
@@ -0,0 +1,222 @@
+import random
+import numpy as np
+from patterns import PatternFeatures
+from replay import n_step_returns
+from stats import RingBuffer
+from zobrist import ZobristHasher
+
+# Per-cell features: the pattern-table shape counts a stone there would make for
+# the player and would block for the opponent, own/opponent stones in the 3x3
+# neighbourhood, distance from the centre, and a bias term.
+N_SHAPES = 7
+N_FEATURES = 2 * N_SHAPES + 4
+
+
+class QNetwork:
+    """
+    Q(s, a) = f(features of cell a in board s), shared across all cells.
+    hidden=0 gives a linear model; otherwise one ReLU hidden layer (a small MLP).
+    Parameters are trained by minibatch SGD on the squared error to a target.
+    """
+
+    def __init__(self, n_features=N_FEATURES, hidden=0, seed=None):
+        rng = np.random.default_rng(seed)
+        self.hidden = hidden
+        if hidden:
+            self.w1 = rng.normal(0, np.sqrt(2 / n_features), (n_features, hidden))
+            self.b1 = np.zeros(hidden)
+            self.w2 = rng.normal(0, np.sqrt(1 / hidden), hidden)
+        else:
+            self.w2 = np.zeros(n_features)
+        self.b2 = 0.0
+
+    def predict(self, features):
+        """Q-values for a (n, n_features) matrix of cell features, in one pass."""
+        if self.hidden:
+            features = np.maximum(features @ self.w1 + self.b1, 0)
+        return features @ self.w2 + self.b2
+
+    def sgd_step(self, features, targets, learning_rate):
+        """One gradient step on the mean squared error over a minibatch; returns the loss."""
+        if self.hidden:
+            hidden = np.maximum(features @ self.w1 + self.b1, 0)
+            errors = hidden @ self.w2 + self.b2 - targets
+            grad_hidden = np.outer(errors, self.w2) * (hidden > 0) / len(targets)
+            self.w2 -= learning_rate * hidden.T @ errors / len(targets)
+            self.w1 -= learning_rate * features.T @ grad_hidden
+            self.b1 -= learning_rate * grad_hidden.sum(axis=0)
+        else:
+            errors = features @ self.w2 + self.b2 - targets
+            self.w2 -= learning_rate * features.T @ errors / len(targets)
+        self.b2 -= learning_rate * float(errors.mean())
+        return float(np.mean(errors ** 2))
+
+    def parameters(self):
+        params = {'w2': self.w2, 'b2': np.array(self.b2)}
+        if self.hidden:
+            params.update(w1=self.w1, b1=self.b1)
+        return params
+
+    def set_parameters(self, params):
+        self.w2 = params['w2']
+        self.b2 = float(params['b2'])
+        if self.hidden:
+            self.w1 = params['w1']
+            self.b1 = params['b1']
+
+
+class ApproxQAI:
+    """
+    Q-learning agent with a function approximator instead of a Q-table, with the
+    same choose_action/learn/reset interface as QLearningAI. All legal moves are
+    scored in one vectorized pass over per-cell pattern features, so similar
+    positions share what was learned and memory stays fixed however many states
+    are seen. Each game's moves are turned into n-step targets at the end of the
+    game (bootstrapping from the agent's own later decisions), kept in a ring
+    buffer, and learned from with minibatch SGD.
+    """
+
+    def __init__(self, player, seed=None, hidden=0, buffer_capacity=50000, batch_size=64,
+                 batches_per_game=8, n_step=None, history=1000):
+        self.player = player  # 1 for black, 2 for white
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.hasher = ZobristHasher()
+        self.canonicalize = False
+        self.model = QNetwork(hidden=hidden, seed=seed)
+        self.patterns = PatternFeatures(self.hasher.board_size)
+        size = self.hasher.board_size
+        ys, xs = np.divmod(np.arange(size * size), size)
+        self.center_distance = np.maximum(abs(ys - size // 2), abs(xs - size // 2)) / (size // 2)
+        self.learning_rate = 0.01
+        self.discount_factor = 0.9
+        self.exploration_rate = 0.45
+        self.exploration_decay = 0.9995
+        self.min_exploration = 0.05
+        self.last_state = None
+        self.last_action = None
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.q_values = []
+        self.rewards = []
+        self.max_q_per_game = RingBuffer(history)
+        self.final_rewards = RingBuffer(history)
+        self.losses_per_game = RingBuffer(history)  # Mean SGD loss after each game
+
+        # Training data: features of each chosen move and its n-step target
+        self.buffer_features = RingBuffer(buffer_capacity, dtype=np.float32, shape=(N_FEATURES,))
+        self.buffer_targets = RingBuffer(buffer_capacity, dtype=np.float32)
+        self.batch_size = batch_size
+        self.batches_per_game = batches_per_game
+        self.n_step = n_step  # None = full return to the end of the game
+        self.episode = []  # [chosen move's features, reward, max Q at decision] per move
+        self.decision = None  # (features, max Q) of the latest choose_action
+
+    def get_state_key(self, board, env=None):
+        if env is not None:
+            return env.state_key
+        return self.hasher.hash_board(board)
+
+    def cell_features(self, board):
+        """(cells, N_FEATURES) float32 feature matrix for every cell of board."""
+        size = self.hasher.board_size
+        board = np.asarray(board)
+        opponent = 3 - self.player
+        features = np.empty((size * size, N_FEATURES), dtype=np.float32)
+        features[:, :N_SHAPES] = self.patterns.shape_counts(board, self.player) / 4
+        features[:, N_SHAPES:2 * N_SHAPES] = self.patterns.shape_counts(board, opponent) / 4
+        # Own and opponent stones in each cell's 3x3 neighbourhood
+        for column, player in ((2 * N_SHAPES, self.player), (2 * N_SHAPES + 1, opponent)):
+            padded = np.pad(board == player, 1).astype(np.float32)
+            near = sum(padded[dy:dy + size, dx:dx + size] for dy in range(3) for dx in range(3))
+            features[:, column] = near.ravel() / 8
+        features[:, -2] = self.center_distance
+        features[:, -1] = 1.0
+        return features
+
+    def choose_action(self, board, env=None):
+        """ε-greedy over all empty cells, scored in one batched model pass."""
+        legal = env.legal_mask if env is not None else np.asarray(board).ravel() == 0
+        available = np.flatnonzero(legal)
+        if len(available) == 0:
+            return None
+
+        features = self.cell_features(board)
+        q = self.model.predict(features[available])
+        best = int(q.argmax())
+        self.q_values.append(float(q[best]))
+
+        if self.rng.random() < self.exploration_rate:
+            best = self.rng.randrange(len(available))
+        cell = int(available[best])
+        self.decision = (features[cell], float(q.max()))
+        return divmod(cell, board.shape[1])
+
+    def learn(self, board, reward, env=None):
+        """Record the reward of the latest move; the model is trained in reset()."""
+        if self.decision is None:
+            # A second learn() for the same move carries the game's outcome
+            if self.episode:
+                self.episode[-1][1] = reward
+        else:
+            features, max_q = self.decision
+            self.episode.append([features, reward, max_q])
+            self.decision = None
+        self.rewards.append(reward)
+        self.exploration_rate = max(
+            self.min_exploration,
+            self.exploration_rate * self.exploration_decay
+        )
+
+    def train_on_episode(self):
+        """Turn the finished game into n-step targets, buffer them and run SGD minibatches."""
+        length = len(self.episode)
+        features = np.array([t[0] for t in self.episode], dtype=np.float32)
+        values = np.array([t[2] for t in self.episode] + [0.0])  # No value after the end
+        returns, offsets = n_step_returns([t[1] for t in self.episode], self.discount_factor,
+                                          self.n_step)
+        targets = returns + self.discount_factor ** (offsets - np.arange(length)) * values[offsets]
+        for f, target in zip(features, targets):
+            self.buffer_features.append(f)
+            self.buffer_targets.append(target)
+
+        losses = []
+        size = len(self.buffer_targets)
+        for _ in range(self.batches_per_game):
+            batch = self.np_rng.integers(0, size, size=min(self.batch_size, size))
+            losses.append(self.model.sgd_step(self.buffer_features.data[batch],
+                                              self.buffer_targets.data[batch], self.learning_rate))
+        self.losses_per_game.append(np.mean(losses))
+        self.episode = []
+
+    def reset(self):
+        """Train on the finished game and reset per-game state."""
+        if self.episode:
+            self.train_on_episode()
+        self.decision = None
+        if self.q_values:
+            self.max_q_per_game.append(max(self.q_values))
+        if self.rewards:
+            self.final_rewards.append(self.rewards[-1])
+        self.last_state = None
+        self.last_action = None
+        self.q_values = []
+        self.rewards = []
+
+    def save(self, path):
+        """Save the model parameters and learning progress to an .npz file at path."""
+        with open(path, 'wb') as f:
+            np.savez(f, hidden=self.model.hidden, player=self.player, wins=self.wins,
+                     losses=self.losses, draws=self.draws,
+                     exploration_rate=self.exploration_rate, **self.model.parameters())
+
+    def load(self, path):
+        with np.load(path) as data:
+            if int(data['hidden']) != self.model.hidden:
+                raise ValueError(f"{path} was saved with hidden={int(data['hidden'])}")
+            self.model.set_parameters({k: data[k] for k in data.files})
+            self.exploration_rate = float(data['exploration_rate'])
+            self.wins = int(data['wins'])
+            self.losses = int(data['losses'])
+            self.draws = int(data['draws'])
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import deque, namedtuple
+from train import play_move
+
+# Immutable picture of a game in progress, for a renderer in another thread
+BoardSnapshot = namedtuple('BoardSnapshot', [
+    'games_started', 'move_history', 'current_player', 'game_over', 'winner', 'move_count',
+])
+
+
+def take_snapshot(env):
+    return BoardSnapshot(env.games_started, tuple(env.move_history), env.current_player,
+                         env.game_over, env.winner, env.move_count)
+
+
+def show_snapshot(view, snapshot):
+    """Make a display-only environment show a snapshot, for its render methods."""
+    view.games_started = snapshot.games_started
+    view.move_history = list(snapshot.move_history)
+    view.current_player = snapshot.current_player
+    view.game_over = snapshot.game_over
+    view.winner = snapshot.winner
+    view.move_count = snapshot.move_count
+
+
+class BackgroundTrainer(threading.Thread):
+    """
+    Plays self-play games at full speed in a background thread while a GUI
+    observes. Every `publish_interval` seconds (and at the end of each game) it
+    publishes a fresh BoardSnapshot by swapping a single reference, so readers
+    never need a lock and never see a half-updated board. Finished games are
+    queued as (winner, move_count) for the GUI thread to fold into its stats.
+    pause() stops it between moves, after which the caller may use the
+    environment and agents directly (e.g. for human play) until resume().
+    """
+
+    def __init__(self, env, black_ai, white_ai, on_game_end=None, publish_interval=1 / 120):
+        super().__init__(daemon=True)
+        self.env = env
+        self.black_ai = black_ai
+        self.white_ai = white_ai
+        self.on_game_end = on_game_end  # Called in this thread with env before each reset
+        self.publish_interval = publish_interval
+        self.snapshot = take_snapshot(env)
+        self.finished_games = deque()  # Appended here, popped by the GUI thread
+        self.games_played = 0
+        self.moves_played = 0
+        self.running = threading.Event()
+        self.running.set()
+        self.idle = threading.Event()  # Set while paused between moves
+        self.stopping = False
+
+    def run(self):
+        env = self.env
+        last_publish = 0.0
+        while not self.stopping:
+            if not self.running.is_set():
+                self.idle.set()
+                self.running.wait(0.1)
+                continue
+            self.idle.clear()
+
+            game_over = play_move(env, self.black_ai, self.white_ai)
+            self.moves_played += 1
+            now = time.perf_counter()
+            if game_over:
+                self.snapshot = take_snapshot(env)  # Always show how each game ended
+                if self.on_game_end:
+                    self.on_game_end(env)
+                self.finished_games.append((env.winner, env.move_count))
+                self.games_played += 1
+                env.reset()
+                self.black_ai.reset()
+                self.white_ai.reset()
+            elif now - last_publish >= self.publish_interval:
+                self.snapshot = take_snapshot(env)
+                last_publish = now
+        self.idle.set()
+
+    def drain_finished_games(self):
+        """Pop and return the (winner, move_count) of games finished since the last call."""
+        games = []
+        while self.finished_games:
+            games.append(self.finished_games.popleft())
+        return games
+
+    def pause(self):
+        """Stop training between moves; returns once the environment is safe to use."""
+        self.running.clear()
+        if self.is_alive():
+            self.idle.wait()
+
+    def resume(self):
+        self.snapshot = take_snapshot(self.env)
+        self.idle.clear()  # So a quick pause() waits for the thread to really stop again
+        self.running.set()
+
+    def stop(self):
+        """Finish the current move and end the thread."""
+        self.stopping = True
+        self.running.set()
+        if self.is_alive():
+            self.join()
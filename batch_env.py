@@ -0,0 +1,127 @@
+import numpy as np
+
+# Offsets along a line, centred on the placed stone. One extra cell beyond
+# the four needed for five-in-a-row lets the open-end check look past a run.
+LINE_OFFSETS = np.arange(-5, 6)
+CENTER = 5
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]  # Horizontal, vertical, diagonal \, diagonal /
+OUT_OF_BOUNDS = -1
+
+
+class BatchGomokuEnvironment:
+    """
+    Steps many Gomoku games at once.
+    All boards live in one int8 array of shape (num_envs, BOARD_SIZE, BOARD_SIZE)
+    and rewards follow GomokuEnvironment.place_stone:
+    - Win: 1 for black, 0 for white (reward of the player who moved)
+    - Draw: 0.5
+    - Open 3-in-a-row: 0.05 bonus
+    - Continue: 0.01 for valid move
+    - Invalid: 0.0
+    Finished games are reset automatically at the end of step().
+    """
+
+    def __init__(self, num_envs, board_size=15):
+        self.num_envs = num_envs
+        self.BOARD_SIZE = board_size
+        self.boards = np.zeros((num_envs, board_size, board_size), dtype=np.int8)
+        self.current_player = np.ones(num_envs, dtype=np.int8)  # 1=black, 2=white
+        self.move_count = np.zeros(num_envs, dtype=np.int16)
+        self.last_game_lengths = np.zeros(num_envs, dtype=np.int16)  # Length of the game that just ended
+
+    def reset(self, mask=None):
+        """Reset all games, or only those selected by a boolean mask."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.boards[mask] = 0
+        self.current_player[mask] = 1
+        self.move_count[mask] = 0
+        return self.boards
+
+    def available_mask(self):
+        """Boolean (num_envs, BOARD_SIZE**2) mask of empty cells."""
+        return self.boards.reshape(self.num_envs, -1) == 0
+
+    def random_moves(self, rng=None):
+        """Pick a uniformly random empty cell for every game as flat indices."""
+        rng = np.random.default_rng() if rng is None else rng
+        scores = rng.random((self.num_envs, self.BOARD_SIZE * self.BOARD_SIZE))
+        scores[~self.available_mask()] = -1.0
+        return scores.argmax(axis=1)
+
+    def step(self, moves):
+        """
+        Play one move in every game. moves holds flat cell indices (y * BOARD_SIZE + x).
+        Returns (rewards, dones, winners); winners is 0 for draws and unfinished games.
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        n_cells = self.BOARD_SIZE * self.BOARD_SIZE
+        games = np.arange(self.num_envs)
+
+        in_range = (moves >= 0) & (moves < n_cells)
+        safe_moves = np.where(in_range, moves, 0)
+        ys, xs = np.divmod(safe_moves, self.BOARD_SIZE)
+        valid = in_range & (self.boards[games, ys, xs] == 0)
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        winners = np.zeros(self.num_envs, dtype=np.int8)
+
+        g, y, x = games[valid], ys[valid], xs[valid]
+        if len(g) == 0:
+            return rewards, dones, winners
+
+        player = self.current_player[g]
+        self.boards[g, y, x] = player
+        self.move_count[g] += 1
+
+        counts, open_ends = self._line_runs(g, y, x, player)
+        three = ((counts == 3) & (open_ends == 2)).any(axis=1)
+        win = (counts >= 5).any(axis=1)
+        draw = ~win & (self.move_count[g] == n_cells)
+
+        step_rewards = np.where(three, 0.06, 0.01).astype(np.float32)
+        step_rewards[win] = np.where(player[win] == 1, 1.0, 0.0)
+        step_rewards[draw] = 0.5
+        rewards[g] = step_rewards
+
+        done = win | draw
+        dones[g] = done
+        winners[g[win]] = player[win]
+        self.current_player[g[~done]] = 3 - player[~done]  # Switch player
+
+        if done.any():
+            self.last_game_lengths[g[done]] = self.move_count[g[done]]
+            self.reset(dones)
+
+        return rewards, dones, winners
+
+    def _line_runs(self, g, y, x, player):
+        """
+        For each placed stone, measure the run of the mover's stones through it in
+        all four directions. Returns (counts, open_ends), both shaped (len(g), 4).
+        """
+        size = self.BOARD_SIZE
+        counts = np.empty((len(g), len(DIRECTIONS)), dtype=np.int16)
+        open_ends = np.empty((len(g), len(DIRECTIONS)), dtype=np.int16)
+        rows = np.arange(len(g))
+
+        for d, (dy, dx) in enumerate(DIRECTIONS):
+            line_y = y[:, None] + LINE_OFFSETS * dy
+            line_x = x[:, None] + LINE_OFFSETS * dx
+            inside = (line_y >= 0) & (line_y < size) & (line_x >= 0) & (line_x < size)
+            cells = self.boards[g[:, None], np.clip(line_y, 0, size - 1), np.clip(line_x, 0, size - 1)]
+            cells = np.where(inside, cells, OUT_OF_BOUNDS)
+
+            own = cells == player[:, None]
+            forward = np.cumprod(own[:, CENTER + 1:], axis=1).sum(axis=1)
+            backward = np.cumprod(own[:, CENTER - 1::-1], axis=1).sum(axis=1)
+            counts[:, d] = 1 + forward + backward
+
+            # The cell just past each end of the run must be on the board and empty
+            forward_end = cells[rows, np.minimum(CENTER + 1 + forward, len(LINE_OFFSETS) - 1)]
+            backward_end = cells[rows, np.maximum(CENTER - 1 - backward, 0)]
+            open_ends[:, d] = ((forward_end == 0) & (forward < CENTER)).astype(np.int16) + \
+                              ((backward_end == 0) & (backward < CENTER)).astype(np.int16)
+
+        return counts, open_ends
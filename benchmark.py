@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+from gomoku import GomokuEnvironment
+from ai import QLearningAI
+from train import finish_game, play_game, play_move
+
+# Metrics where a higher value is better; every other numeric metric is a cost
+HIGHER_IS_BETTER = ('moves_per_sec', 'games_per_sec')
+NOT_COMPARED = ('calls', 'q_table_entries')  # Workload sizes, not performance
+
+
+def latency_summary(samples_ns):
+    """Mean and percentile latencies in microseconds of a list of nanosecond timings."""
+    samples = np.asarray(samples_ns, dtype=np.float64) / 1000
+    if not len(samples):
+        return {}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        'calls': len(samples),
+        'mean_us': float(samples.mean()),
+        'p50_us': float(p50),
+        'p95_us': float(p95),
+        'p99_us': float(p99),
+    }
+
+
+def bench_environment(engine, games, seed):
+    """Random-move games: throughput plus place_stone/check_win/check_three_open latencies."""
+    rng = random.Random(seed)
+    env = GomokuEnvironment(engine=engine)
+    timings = {'place_stone': [], 'check_win': [], 'check_three_open': []}
+    clock = time.perf_counter_ns
+    for _ in range(games):
+        env.reset()
+        while not env.game_over:
+            y, x = divmod(rng.choice(env.free_cells), env.BOARD_SIZE)
+            t0 = clock()
+            env.place_stone(y, x)
+            t1 = clock()
+            env.check_win(y, x)
+            t2 = clock()
+            env.check_three_open(y, x)
+            t3 = clock()
+            timings['place_stone'].append(t1 - t0)
+            timings['check_win'].append(t2 - t1)
+            timings['check_three_open'].append(t3 - t2)
+
+    # Throughput without the extra check calls
+    start = time.perf_counter()
+    throughput_moves = 0
+    for _ in range(games):
+        env.reset()
+        while not env.game_over:
+            env.place_stone(*divmod(rng.choice(env.free_cells), env.BOARD_SIZE))
+            throughput_moves += 1
+    elapsed = time.perf_counter() - start
+    results = {
+        'moves_per_sec': throughput_moves / elapsed,
+        'games_per_sec': games / elapsed,
+    }
+    for name, samples in timings.items():
+        results[name] = latency_summary(samples)
+    return results
+
+
+def q_table_bytes_per_entry(q_table):
+    """Measured memory per Q-table entry: row array, key int and hash table slot."""
+    if not len(q_table):
+        return 0.0
+    rows = sum(sys.getsizeof(row) for row in q_table.values())
+    keys = sum(sys.getsizeof(key) for key in q_table.keys())
+    table = sys.getsizeof(q_table) if isinstance(q_table, dict) else 0
+    return (rows + keys + table) / len(q_table)
+
+
+def bench_agent(games, warmup_games, seed):
+    """Self-play with per-call get_state_key/choose_action/learn latencies and Q-table size."""
+    env = GomokuEnvironment(engine='bitboard')
+    black_ai = QLearningAI(1, seed=seed)
+    white_ai = QLearningAI(2, seed=seed + 1)
+    for _ in range(warmup_games):
+        play_game(env, black_ai, white_ai)
+
+    timings = {'get_state_key': [], 'choose_action': [], 'learn': []}
+    clock = time.perf_counter_ns
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        env.reset()
+        black_ai.reset()
+        white_ai.reset()
+        while not env.game_over:
+            # Same steps as train.play_move, timed individually
+            ai = black_ai if env.current_player == 1 else white_ai
+            t0 = clock()
+            ai.last_state = ai.get_state_key(env.board, env)
+            t1 = clock()
+            move = ai.choose_action(env.board, env)
+            t2 = clock()
+            ai.last_action = move
+            timings['get_state_key'].append(t1 - t0)
+            timings['choose_action'].append(t2 - t1)
+            reward, done = env.place_stone(*move)
+            moves += 1
+            if done:
+                finish_game(env, black_ai, white_ai)
+            else:
+                t3 = clock()
+                ai.learn(env.board, reward, env)
+                timings['learn'].append(clock() - t3)
+    elapsed = time.perf_counter() - start
+
+    results = {
+        'moves_per_sec': moves / elapsed,
+        'games_per_sec': games / elapsed,
+        'q_table_entries': len(black_ai.q_table) + len(white_ai.q_table),
+        'q_table_bytes_per_entry': q_table_bytes_per_entry(black_ai.q_table),
+    }
+    for name, samples in timings.items():
+        results[name] = latency_summary(samples)
+    return results
+
+
+def bench_render(frames, seed):
+    """
+    Frame time of the GUI drawing path (incremental board, info panel, status
+    line and display update) on SDL's dummy video driver, so no window is needed.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # Keep stdout pure JSON
+    import pygame
+    from main import INFO_WIDTH
+    from visualization import GomokuVisualization
+
+    pygame.init()
+    env = GomokuEnvironment(engine='bitboard')
+    black_ai = QLearningAI(1, seed=seed)
+    white_ai = QLearningAI(2, seed=seed + 1)
+    visualizer = GomokuVisualization(env, black_ai, white_ai)
+    screen = pygame.display.set_mode((env.BOARD_WIDTH + INFO_WIDTH, env.BOARD_HEIGHT))
+
+    frame_times = []
+    panel_times = []
+    clock = time.perf_counter_ns
+    for _ in range(frames):
+        if play_move(env, black_ai, white_ai):
+            visualizer.update_stats(env.winner, env.move_count)
+            env.reset()
+            black_ai.reset()
+            white_ai.reset()
+        t0 = clock()
+        dirty_rects = env.render_incremental(screen)
+        t1 = clock()
+        dirty_rects.append(visualizer.draw_info_panel(screen, INFO_WIDTH))
+        t2 = clock()
+        status = visualizer.font.render(f"Move {env.move_count}", True, (0, 0, 255))
+        screen.blit(status, (env.MARGIN, 10))
+        pygame.display.update(dirty_rects)
+        frame_times.append(clock() - t0)
+        panel_times.append(t2 - t1)
+    pygame.quit()
+    return {
+        'frame': latency_summary(frame_times),
+        'draw_info_panel': latency_summary(panel_times),
+    }
+
+
+def git_commit():
+    """Short commit hash of this checkout, wherever the benchmark is run from."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(seed=0, games=200, agent_games=200, warmup_games=500, frames=300, render=True):
+    """Run every benchmark and return the results as a JSON-serialisable dict."""
+    random.seed(seed)
+    np.random.seed(seed)
+    results = {
+        'meta': {
+            'seed': seed,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'environment': {engine: bench_environment(engine, games, seed)
+                        for engine in ('array', 'bitboard')},
+        'agent': bench_agent(agent_games, warmup_games, seed),
+    }
+    if render:
+        results['render'] = bench_render(frames, seed)
+    return results
+
+
+def flatten(results, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}, numeric leaves only."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline, current, tolerance):
+    """
+    Return the metrics that got worse than baseline by more than tolerance
+    (a fraction), as (name, baseline value, current value) tuples.
+    """
+    regressions = []
+    old, new = flatten(baseline), flatten(current)
+    for name, before in old.items():
+        metric = name.rsplit('.', 1)[-1]
+        if name.startswith('meta.') or metric in NOT_COMPARED or name not in new or not before:
+            continue
+        after = new[name]
+        change = (after - before) / before
+        if metric in HIGHER_IS_BETTER:
+            change = -change
+        if change > tolerance:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seeded headless benchmarks of the Gomoku hot paths")
+    parser.add_argument('--seed', type=int, default=0, help="seed for every benchmark")
+    parser.add_argument('--games', type=int, default=200, help="random games per board engine")
+    parser.add_argument('--agent-games', type=int, default=200, help="timed self-play games")
+    parser.add_argument('--warmup-games', type=int, default=500,
+                        help="self-play games to fill the Q-tables before timing")
+    parser.add_argument('--frames', type=int, default=300, help="rendered frames to time")
+    parser.add_argument('--no-render', action='store_true', help="skip the renderer benchmark")
+    parser.add_argument('--output', default=None, help="write the JSON results here (default: stdout)")
+    parser.add_argument('--compare', default=None,
+                        help="baseline JSON file; exit with status 1 if any metric regressed")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(seed=args.seed, games=args.games, agent_games=args.agent_games,
+                             warmup_games=args.warmup_games, frames=args.frames,
+                             render=not args.no_render)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.4g} -> {after:.4g}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+class BitBoard:
+    """
+    Board engine that stores each player's stones as integer bitmasks, one per
+    row, column, diagonal and anti-diagonal. Bit i of a line mask is the i-th
+    cell along that line, so neighbouring stones are neighbouring bits and run
+    detection becomes a few shifts and ANDs on a single Python int.
+    """
+
+    def __init__(self, size=15):
+        self.size = size
+        # For every cell, the (line index, bit) it occupies in each of the 4 directions
+        self.cell_lines = [
+            (
+                (y, x),                    # Horizontal: row y, bit x
+                (x, y),                    # Vertical: column x, bit y
+                (y - x + size - 1, x),     # Diagonal \: constant y - x
+                (y + x, x),                # Diagonal /: constant y + x
+            )
+            for y in range(size) for x in range(size)
+        ]
+        # Mask of the cells that exist on each line (diagonals are shorter)
+        self.line_masks = [[0] * (2 * size - 1) for _ in range(4)]
+        for y in range(size):
+            for x in range(size):
+                for direction, (line, bit) in enumerate(self.cell_lines[y * size + x]):
+                    self.line_masks[direction][line] |= 1 << bit
+        self.reset()
+
+    def reset(self):
+        """Clear all stones. lines[player][direction][line] is that player's mask."""
+        self.lines = [None] + [[[0] * (2 * self.size - 1) for _ in range(4)] for _ in range(2)]
+
+    def place(self, y, x, player):
+        """Add a stone for player (1 or 2) at (y,x)."""
+        own = self.lines[player]
+        for direction, (line, bit) in enumerate(self.cell_lines[y * self.size + x]):
+            own[direction][line] |= 1 << bit
+
+    def remove(self, y, x, player):
+        """Take player's stone at (y,x) back off the board."""
+        own = self.lines[player]
+        for direction, (line, bit) in enumerate(self.cell_lines[y * self.size + x]):
+            own[direction][line] &= ~(1 << bit)
+
+    def check_win(self, y, x, player):
+        """Check if player has five or more in a row through (y,x)."""
+        own = self.lines[player]
+        for direction, (line, bit) in enumerate(self.cell_lines[y * self.size + x]):
+            m = own[direction][line]
+            fives = m & (m >> 1) & (m >> 2) & (m >> 3) & (m >> 4)  # Bit s set = five starting at s
+            if fives & ((0x1F << bit) >> 4):  # Any five starting at bit-4..bit covers (y,x)
+                return True
+        return False
+
+    def check_three_open(self, y, x, player):
+        """
+        Check if (y,x) is part of exactly three in a row for player with an empty
+        cell on both ends, matching GomokuEnvironment.check_three_open.
+        """
+        own = self.lines[player]
+        opp = self.lines[3 - player]
+        for direction, (line, bit) in enumerate(self.cell_lines[y * self.size + x]):
+            m = own[direction][line]
+            empty = self.line_masks[direction][line] & ~(m | opp[direction][line])
+            # Bit t set = ".XXX." pattern with its first empty cell at t
+            threes = empty & (m >> 1) & (m >> 2) & (m >> 3) & (empty >> 4)
+            if threes & ((0b111 << bit) >> 3):  # Patterns starting at bit-3..bit-1 cover (y,x)
+                return True
+        return False
+
+    def line_windows(self, y, x, player):
+        """
+        The 9-cell window of each line through (y,x) for patterns.window_shapes:
+        a list of 4 (own, blocked) bitmasks, bit 4 being (y,x) itself and cells
+        off the board counting as blocked.
+        """
+        own = self.lines[player]
+        opp = self.lines[3 - player]
+        windows = []
+        for direction, (line, bit) in enumerate(self.cell_lines[y * self.size + x]):
+            m = own[direction][line]
+            blocked = opp[direction][line] | ~self.line_masks[direction][line]
+            shift = bit - 4
+            if shift >= 0:
+                windows.append(((m >> shift) & 0x1FF, (blocked >> shift) & 0x1FF))
+            else:  # Window starts before the line does
+                windows.append(((m << -shift) & 0x1FF,
+                                ((blocked << -shift) | ((1 << -shift) - 1)) & 0x1FF))
+        return windows
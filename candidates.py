@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class CandidateMoves:
+    """
+    Tracks the candidate moves worth considering: empty cells within `radius`
+    (in both directions, i.e. a square neighbourhood) of an existing stone, or
+    just the centre point while the board is empty.
+    """
+
+    def __init__(self, board_size=15, radius=2):
+        self.board_size = board_size
+        self.radius = radius
+        self.center = (board_size // 2) * board_size + board_size // 2
+        # neighbourhoods[c] = flat indices of all cells within radius of cell c (including c)
+        self.neighbourhoods = []
+        for y in range(board_size):
+            for x in range(board_size):
+                ys = range(max(0, y - radius), min(board_size, y + radius + 1))
+                xs = range(max(0, x - radius), min(board_size, x + radius + 1))
+                self.neighbourhoods.append(np.array([ny * board_size + nx for ny in ys for nx in xs]))
+        self.reset()
+
+    def reset(self):
+        """Start over from an empty board, where only the centre is a candidate."""
+        self.mask = np.zeros(self.board_size * self.board_size, dtype=bool)
+        self.mask[self.center] = True
+        self.empty_board = True
+
+    def place(self, cell, legal_mask):
+        """Update the candidates after a stone lands on a flat cell; legal_mask is already updated."""
+        if self.empty_board:
+            self.mask[self.center] = False
+            self.empty_board = False
+        neighbourhood = self.neighbourhoods[cell]
+        self.mask[neighbourhood] = legal_mask[neighbourhood]
+
+    def mask_for_board(self, board):
+        """Compute the candidate mask of a board from scratch."""
+        stones = np.asarray(board) != 0
+        if not stones.any():
+            mask = np.zeros(self.board_size * self.board_size, dtype=bool)
+            mask[self.center] = True
+            return mask
+        # Dilate the stones by radius in every direction, then keep the empty cells
+        r = self.radius
+        padded = np.pad(stones, r)
+        near = np.zeros_like(stones)
+        for dy in range(2 * r + 1):
+            for dx in range(2 * r + 1):
+                near |= padded[dy:dy + self.board_size, dx:dx + self.board_size]
+        return (near & ~stones).ravel()
@@ -0,0 +1,219 @@
+import os
+import traceback
+import numpy as np
+
+# File layout: a 64-byte header, then n_states sorted uint64 state keys, then an
+# (n_states, n_actions) float32 matrix of action values in the same order, then
+# (when FLAG_ORIENTATIONS is set) one uint8 orientation bitmask per state.
+MAGIC = b'GMQT'
+VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u4'),
+    ('n_states', '<u8'),
+    ('n_actions', '<u4'),
+    ('player', '<u4'),
+    ('flags', '<u4'),
+    ('reserved', '<u4'),
+    ('wins', '<u8'),
+    ('losses', '<u8'),
+    ('draws', '<u8'),
+    ('exploration_rate', '<f8'),
+])
+FLAG_CANONICAL = 1  # Keys are canonical (symmetry-folded) Zobrist keys
+FLAG_ORIENTATIONS = 2  # Orientation bitmasks (which board orientations each state was learned from) follow the rows
+WRITE_CHUNK = 4096  # Rows stacked per write while saving
+
+
+def save_q_table(path, q_table, n_actions, orientations=None, **metadata):
+    """
+    Write a Q-table (any mapping of int key -> action-value row) to path.
+    metadata fills the matching header fields (player, flags, wins, ...);
+    orientations (key -> bitmask) is stored after the rows when given.
+    The file is written next to path and renamed into place, so readers never
+    see a half-written checkpoint.
+    """
+    keys = np.fromiter(q_table.keys(), dtype=np.uint64, count=len(q_table))
+    rows = list(q_table.values())
+    order = np.argsort(keys)
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['n_states'] = len(keys)
+    header['n_actions'] = n_actions
+    for field, value in metadata.items():
+        header[field] = value
+    if orientations is not None:
+        header['flags'] |= FLAG_ORIENTATIONS
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(keys[order].tobytes())
+        for start in range(0, len(order), WRITE_CHUNK):
+            chunk = [rows[i] for i in order[start:start + WRITE_CHUNK]]
+            f.write(np.asarray(chunk, dtype=np.float32).tobytes())
+        if orientations is not None:
+            masks = np.array([orientations.get(key, 0) for key in keys[order].tolist()], dtype=np.uint8)
+            f.write(masks.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Read and validate the header of a Q-table checkpoint."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header['magic'][0] != MAGIC:
+        raise ValueError(f"{path} is not a Q-table checkpoint")
+    if header['version'][0] != VERSION:
+        raise ValueError(f"Unsupported Q-table checkpoint version {header['version'][0]} in {path}")
+    return header[0]
+
+
+class MappedQTable:
+    """
+    Read-mostly Q-table backed by a memory-mapped checkpoint file.
+    Opening is near-instant regardless of size, and processes mapping the same
+    file share its pages. Rows are mapped copy-on-write, so updating a stored
+    row only touches this process's private copy; new states go to an
+    in-memory overlay. Saving the table again writes the merged result.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = read_header(path)
+        n_states = int(self.header['n_states'])
+        n_actions = int(self.header['n_actions'])
+        self.n_actions = n_actions
+        keys_offset = HEADER_DTYPE.itemsize
+        values_offset = keys_offset + 8 * n_states
+        if n_states:
+            self.state_keys = np.memmap(path, dtype=np.uint64, mode='r',
+                                        offset=keys_offset, shape=(n_states,))
+            self.rows = np.memmap(path, dtype=np.float32, mode='c',
+                                  offset=values_offset, shape=(n_states, n_actions))
+        else:
+            # np.memmap cannot map zero bytes
+            self.state_keys = np.zeros(0, dtype=np.uint64)
+            self.rows = np.zeros((0, n_actions), dtype=np.float32)
+        self.overlay = {}  # States first seen after loading
+
+    def _find(self, key):
+        """Row index of key in the mapped file, or -1."""
+        if not len(self.state_keys):
+            return -1
+        key = np.uint64(key)
+        i = int(np.searchsorted(self.state_keys, key))
+        if i < len(self.state_keys) and self.state_keys[i] == key:
+            return i
+        return -1
+
+    def get(self, key, default=None):
+        row = self.overlay.get(key)
+        if row is not None:
+            return row
+        i = self._find(key)
+        return self.rows[i] if i >= 0 else default
+
+    def __getitem__(self, key):
+        row = self.get(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def __setitem__(self, key, row):
+        i = self._find(key)
+        if i >= 0:
+            self.rows[i] = row
+        else:
+            self.overlay[key] = row
+
+    def __contains__(self, key):
+        return key in self.overlay or self._find(key) >= 0
+
+    def __len__(self):
+        return len(self.state_keys) + len(self.overlay)
+
+    def keys(self):
+        for key in self.state_keys:
+            yield int(key)
+        yield from self.overlay
+
+    def values(self):
+        yield from self.rows
+        yield from self.overlay.values()
+
+    def items(self):
+        yield from zip(self.keys(), self.values())
+
+
+def load_orientations(path, header):
+    """Return the checkpoint's key -> orientation bitmask dict, or None if it has none."""
+    if not header['flags'] & FLAG_ORIENTATIONS:
+        return None
+    n_states = int(header['n_states'])
+    offset = HEADER_DTYPE.itemsize + n_states * (8 + 4 * int(header['n_actions']))
+    keys = np.fromfile(path, dtype=np.uint64, count=n_states, offset=HEADER_DTYPE.itemsize)
+    masks = np.fromfile(path, dtype=np.uint8, count=n_states, offset=offset)
+    return {key: mask for key, mask in zip(keys.tolist(), masks.tolist()) if mask}
+
+
+def load_q_table(path, mmap=True):
+    """
+    Open a checkpoint as a MappedQTable, or read it fully into a dict of rows
+    when mmap is False. Returns (q_table, header).
+    """
+    table = MappedQTable(path)
+    if mmap:
+        return table, table.header
+    return {key: np.array(row) for key, row in table.items()}, table.header
+
+
+class BackgroundCheckpointer:
+    """
+    Runs checkpoint writes in a forked child process, which gets a copy-on-write
+    snapshot of the Q-tables for free, so the training loop keeps running while
+    the files are written. Falls back to writing inline where fork is unavailable.
+    """
+
+    def __init__(self):
+        self.pid = None
+
+    def busy(self):
+        """True while a previously started write is still running."""
+        if self.pid is None:
+            return False
+        pid, _ = os.waitpid(self.pid, os.WNOHANG)
+        if pid == 0:
+            return True
+        self.pid = None
+        return False
+
+    def start(self, write):
+        """
+        Call write() in the background. Returns False (and skips this checkpoint)
+        if the previous one is still being written.
+        """
+        if self.busy():
+            return False
+        if not hasattr(os, 'fork'):
+            write()
+            return True
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                write()
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        self.pid = pid
+        return True
+
+    def wait(self):
+        """Block until any in-flight write has finished."""
+        if self.pid is not None:
+            os.waitpid(self.pid, 0)
+            self.pid = None
@@ -0,0 +1,283 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from itertools import combinations
+import numpy as np
+from gomoku import GomokuEnvironment
+from ai import QLearningAI
+from approx_ai import ApproxQAI
+from checkpoint import FLAG_CANONICAL, read_header
+from search import AlphaBetaAI
+from train import checkpoint_paths
+
+# Agent specs: 'random', 'tabular:<checkpoint prefix>', 'approx:<checkpoint prefix>'
+# (ApproxQAI .npz checkpoints) or 'search[:<seconds per move>]'
+ELO_SCALE = 400 / math.log(10)
+
+
+class RandomPlayer:
+    """Baseline that plays a uniformly random empty cell."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def reset(self):
+        """Nothing to clear between games."""
+
+    def choose_action(self, board, env=None):
+        if not env.free_cells:
+            return None
+        return divmod(self.rng.choice(env.free_cells), env.BOARD_SIZE)
+
+
+def make_player(spec, player, seed=None):
+    """Build the agent described by spec to play as player, with exploration off."""
+    kind, _, arg = spec.partition(':')
+    if kind == 'random':
+        return RandomPlayer(seed)
+    if kind == 'search':
+        return AlphaBetaAI(player, time_limit=float(arg or 0.05))
+    path = checkpoint_paths(arg)[player - 1]
+    if kind == 'tabular':
+        canonical = bool(read_header(path)['flags'] & FLAG_CANONICAL)
+        ai = QLearningAI(player, seed=seed, canonicalize=canonical)
+    elif kind == 'approx':
+        with np.load(path) as data:
+            hidden = int(data['hidden'])
+        ai = ApproxQAI(player, seed=seed, hidden=hidden)
+    else:
+        raise ValueError(f"Unknown agent spec: {spec}")
+    ai.load(path)  # Tabular checkpoints are memory-mapped, so training files are never touched
+    ai.exploration_rate = 0.0
+    return ai
+
+
+def play_eval_game(env, black, white, rng, opening_moves=0):
+    """
+    Play one game without any learning and return the winner (1, 2 or None).
+    The first opening_moves plies are random empty cells anywhere on the board,
+    so that matches between deterministic greedy agents don't replay a handful of
+    games (near-stone plies from the centre opening allow only a few dozen).
+    """
+    env.reset()
+    black.reset()  # Clear per-game state (tracked Q-values, last move) as training does
+    white.reset()
+    while not env.game_over:
+        if env.move_count < opening_moves:
+            move = divmod(rng.choice(env.free_cells), env.BOARD_SIZE)
+        else:
+            ai = black if env.current_player == 1 else white
+            move = ai.choose_action(env.board, env)
+            if move is None:
+                break
+        env.place_stone(*move)
+    return env.winner
+
+
+def match_worker(task):
+    """
+    Play n_games with spec_a as black against spec_b; returns (a wins, b wins, draws,
+    moves) and the set of games played, each as a hash of its move sequence.
+    """
+    spec_a, spec_b, n_games, seed, opening_moves = task
+    env = GomokuEnvironment(engine='bitboard')
+    black = make_player(spec_a, 1, seed)
+    white = make_player(spec_b, 2, seed + 1)
+    rng = random.Random(seed)
+    results = [0, 0, 0, 0]
+    game_hashes = set()
+    for _ in range(n_games):
+        winner = play_eval_game(env, black, white, rng, opening_moves)
+        results[{1: 0, 2: 1, None: 2}[winner]] += 1
+        results[3] += env.move_count
+        game_hashes.add(hash(tuple(env.move_history)))
+    return results, game_hashes
+
+
+def lower_priority():
+    """Pool initializer: run evaluation below the priority of any training processes."""
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+
+def fit_elo(scores, games, iterations=200):
+    """
+    Bradley-Terry maximum-likelihood ratings (in Elo points, mean 0) from a matrix
+    of pairwise scores (wins + draws/2) and games played. A virtual drawn game per
+    played pair keeps ratings finite when a player won or lost every game.
+    """
+    played = games > 0
+    scores = scores + 0.5 * played
+    games = games + 1.0 * played
+    strength = np.ones(len(scores))
+    for _ in range(iterations):
+        denominators = (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        strength = scores.sum(axis=1) / np.maximum(denominators, 1e-12)
+        strength /= np.exp(np.log(strength).mean())
+    ratings = ELO_SCALE * np.log(strength)
+    return ratings - ratings.mean()
+
+
+def wilson_interval(score, n, z=1.96):
+    """95% Wilson score interval of a rate observed as `score` out of n."""
+    if n == 0:
+        return 0.0, 1.0
+    p = score / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def elo_intervals(outcomes, n_agents, resamples=200, seed=0):
+    """
+    95% Elo intervals by bootstrap: resample every pair's win/loss/draw counts and
+    refit. Outcomes are drawn from the counts plus the virtual draw fit_elo adds,
+    so a one-sided result like 200-0 still gets an interval of nonzero width. That
+    pulls samples slightly towards even, so each interval is widened to take in the
+    ratings fitted to the observed counts.
+    """
+    rng = np.random.default_rng(seed)
+
+    def fit(sample):
+        scores = np.zeros((n_agents, n_agents))
+        games = np.zeros((n_agents, n_agents))
+        for (i, j), counts in outcomes.items():
+            n = sum(counts)
+            wins, losses, draws = sample(n, counts)
+            scores[i, j] += wins + draws / 2
+            scores[j, i] += losses + draws / 2
+            games[i, j] += n
+            games[j, i] += n
+        return fit_elo(scores, games)
+
+    observed = fit(lambda n, counts: counts)
+    samples = [fit(lambda n, counts: rng.multinomial(n, (np.array(counts) + [0, 0, 1]) / (n + 1)))
+               for _ in range(resamples)]
+    low, high = np.percentile(samples, [2.5, 97.5], axis=0)
+    return np.minimum(low, observed), np.maximum(high, observed)
+
+
+def round_robin(specs, games_per_pair=200, workers=None, seed=0, opening_moves=2, chunk=50):
+    """
+    Play every pair of agents games_per_pair times (half with each colour) across a
+    process pool, and return a results dict with per-agent and per-pair tables.
+    """
+    workers = workers or os.cpu_count()
+    tasks = []
+    for i, j in combinations(range(len(specs)), 2):
+        for black, white in ((i, j), (j, i)):
+            remaining = games_per_pair // 2
+            while remaining > 0:
+                n = min(chunk, remaining)
+                tasks.append(((black, white), (specs[black], specs[white], n,
+                                               seed + 2 * len(tasks), opening_moves)))
+                remaining -= n
+
+    start_time = time.perf_counter()
+    with multiprocessing.get_context('fork').Pool(workers, initializer=lower_priority) as pool:
+        results = pool.map(match_worker, [task for _, task in tasks])
+    elapsed = time.perf_counter() - start_time
+
+    # outcomes[(i, j)] = [i wins, j wins, draws] with i < j, colours combined
+    outcomes = {}
+    distinct = {}  # (i, j) -> hashes of the distinct games, as the intervals assume independent games
+    total_games = total_moves = 0
+    for ((black, white), _), ((black_wins, white_wins, draws, moves), game_hashes) in zip(tasks, results):
+        i, j = min(black, white), max(black, white)
+        distinct.setdefault((i, j), set()).update((black, game) for game in game_hashes)
+        counts = outcomes.setdefault((i, j), [0, 0, 0])
+        counts[0] += black_wins if black == i else white_wins
+        counts[1] += white_wins if black == i else black_wins
+        counts[2] += draws
+        total_games += black_wins + white_wins + draws
+        total_moves += moves
+
+    n = len(specs)
+    scores = np.zeros((n, n))
+    games = np.zeros((n, n))
+    for (i, j), (wins_i, wins_j, draws) in outcomes.items():
+        scores[i, j] = wins_i + draws / 2
+        scores[j, i] = wins_j + draws / 2
+        games[i, j] = games[j, i] = wins_i + wins_j + draws
+    ratings = fit_elo(scores, games)
+    low, high = elo_intervals(outcomes, n, seed=seed)
+
+    agents = []
+    for k, spec in enumerate(specs):
+        played = games[k].sum()
+        score_low, score_high = wilson_interval(scores[k].sum(), played)
+        agents.append({
+            'agent': spec,
+            'games': int(played),
+            'score': float(scores[k].sum() / played) if played else 0.0,
+            'score_ci': [score_low, score_high],
+            'elo': float(ratings[k]),
+            'elo_ci': [float(low[k]), float(high[k])],
+        })
+    pairs = []
+    for (i, j), (wins_i, wins_j, draws) in outcomes.items():
+        total = wins_i + wins_j + draws
+        pairs.append({
+            'agent': specs[i],
+            'opponent': specs[j],
+            'wins': wins_i,
+            'losses': wins_j,
+            'draws': draws,
+            'distinct_games': len(distinct[(i, j)]),
+            'score': (wins_i + draws / 2) / total,
+            'score_ci': list(wilson_interval(wins_i + draws / 2, total)),
+        })
+    return {
+        'agents': sorted(agents, key=lambda a: -a['elo']),
+        'pairs': pairs,
+        'games': total_games,
+        'seconds': elapsed,
+        'games_per_second': total_games / max(elapsed, 1e-9),
+        'moves_per_second': total_moves / max(elapsed, 1e-9),
+    }
+
+
+def print_results(results):
+    print(f"{'agent':<30} {'games':>6} {'score':>7} {'95% CI':>16} {'Elo':>6} {'95% CI':>14}")
+    for a in results['agents']:
+        score_ci = f"[{a['score_ci'][0]:.1%}, {a['score_ci'][1]:.1%}]"
+        elo_ci = f"[{a['elo_ci'][0]:.0f}, {a['elo_ci'][1]:.0f}]"
+        print(f"{a['agent']:<30} {a['games']:>6} {a['score']:>7.1%} {score_ci:>16} "
+              f"{a['elo']:>6.0f} {elo_ci:>14}")
+    print()
+    print(f"{'agent':<30} {'opponent':<30} {'W/L/D':>13} {'distinct':>8} {'score':>7} {'95% CI':>16}")
+    for p in results['pairs']:
+        record = f"{p['wins']}/{p['losses']}/{p['draws']}"
+        score_ci = f"[{p['score_ci'][0]:.1%}, {p['score_ci'][1]:.1%}]"
+        print(f"{p['agent']:<30} {p['opponent']:<30} {record:>13} {p['distinct_games']:>8} "
+              f"{p['score']:>7.1%} {score_ci:>16}")
+    print(f"\n{results['games']} games in {results['seconds']:.1f}s: "
+          f"{results['games_per_second']:.0f} games/s, {results['moves_per_second']:.0f} moves/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-robin evaluation of Gomoku agents with Elo ratings")
+    parser.add_argument('agents', nargs='+',
+                        help="agent specs: random, tabular:<prefix>, approx:<prefix>, search[:<seconds>]")
+    parser.add_argument('--games', type=int, default=200, help="games per pair of agents")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--seed', type=int, default=0, help="seed for openings and random players")
+    parser.add_argument('--opening-moves', type=int, default=2,
+                        help="random plies at the start of each game")
+    parser.add_argument('--json', default=None, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = round_robin(args.agents, games_per_pair=args.games, workers=args.workers,
+                          seed=args.seed, opening_moves=args.opening_moves)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
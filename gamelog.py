@@ -0,0 +1,94 @@
+import numpy as np
+
+# File layout: a sequence of chunks, each a 12-byte header followed by n_bytes of
+# game records. A game record is [n_plies uint8][result uint8][cell uint8 * n_plies],
+# where result is 0 for a draw, 1 for black and 2 for white, and each cell is the
+# flat board index (y * 15 + x) of a move, black moving first.
+MAGIC = b'GMLG'
+CHUNK_HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('n_games', '<u4'),
+    ('n_bytes', '<u4'),
+])
+
+
+class GameLogWriter:
+    """
+    Append-only writer of finished games. Records are buffered in memory and
+    written as one chunk every `games_per_chunk` games (and on close), so a crash
+    loses at most the games of the chunk being filled, and an interrupted write
+    only ever truncates the last chunk, which readers skip.
+    """
+
+    def __init__(self, path, games_per_chunk=256, board_size=15):
+        self.path = path
+        self.games_per_chunk = games_per_chunk
+        self.board_size = board_size
+        self.file = open(path, 'ab')
+        self.buffer = bytearray()
+        self.buffered_games = 0
+        self.games_written = 0
+
+    def add(self, cells, winner):
+        """Add one game given its flat move cells in play order and winner (1, 2 or None)."""
+        cells = bytes(cells)
+        self.buffer.append(len(cells))
+        self.buffer.append(winner or 0)
+        self.buffer += cells
+        self.buffered_games += 1
+        if self.buffered_games >= self.games_per_chunk:
+            self.flush()
+
+    def record(self, env):
+        """Add the game just finished in env."""
+        self.add([y * self.board_size + x for y, x, _ in env.move_history], env.winner)
+
+    def flush(self):
+        """Write the buffered games as one chunk."""
+        if not self.buffered_games:
+            return
+        header = np.zeros(1, dtype=CHUNK_HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['n_games'] = self.buffered_games
+        header['n_bytes'] = len(self.buffer)
+        self.file.write(header.tobytes() + bytes(self.buffer))
+        self.file.flush()
+        self.games_written += self.buffered_games
+        self.buffer = bytearray()
+        self.buffered_games = 0
+
+    def close(self):
+        if self.file:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_games(path):
+    """
+    Stream the games of a log file one chunk at a time.
+    Yields (cells, winner) with cells a uint8 array of flat move indices and
+    winner 1, 2 or None for a draw. A truncated final chunk is ignored.
+    """
+    with open(path, 'rb') as f:
+        while True:
+            header = np.frombuffer(f.read(CHUNK_HEADER_DTYPE.itemsize), dtype=CHUNK_HEADER_DTYPE)
+            if len(header) != 1:
+                return
+            if header['magic'][0] != MAGIC:
+                raise ValueError(f"{path} is not a game log (bad chunk header)")
+            n_bytes = int(header['n_bytes'][0])
+            data = np.frombuffer(f.read(n_bytes), dtype=np.uint8)
+            if len(data) != n_bytes:
+                return
+            pos = 0
+            for _ in range(int(header['n_games'][0])):
+                n_plies, result = int(data[pos]), int(data[pos + 1])
+                yield data[pos + 2:pos + 2 + n_plies], result or None
+                pos += 2 + n_plies
@@ -1,9 +1,13 @@
-import pygame
 import numpy as np
 from ai import QLearningAI
+from bitboard import BitBoard
+from candidates import CandidateMoves
+from patterns import FIVE, OPEN_THREE, board_windows, window_shapes
+from symmetry import BoardSymmetry
+from zobrist import ZobristHasher
 
 class GomokuEnvironment:
-    def __init__(self):
+    def __init__(self, engine='array', candidate_radius=2):
         # Game constants
         self.BOARD_SIZE = 15  # 15x15 board
         self.GRID_SIZE = 40  # pixels per grid square
@@ -26,9 +30,52 @@ class GomokuEnvironment:
         self.game_over = False
         self.winner = None
         self.move_count = 0
+        self.move_history = []  # (y, x, player) for every stone placed this game
+        self.games_started = 0  # Bumped by reset(), so renderers can tell games apart
         
-        # Initialize pygame
-        pygame.init()
+        # Pre-rendered empty board and incremental rendering state
+        self.background = None
+        self.rendered_game = None
+        self.rendered_moves = 0
+        
+        # Win/open-3 detection: 'array' walks self.board, 'bitboard' uses per-line bitmasks
+        if engine not in ('array', 'bitboard'):
+            raise ValueError(f"Unknown board engine: {engine}")
+        self.engine = engine
+        self.bitboard = BitBoard(self.BOARD_SIZE) if engine == 'bitboard' else None
+        
+        # Zobrist key of self.board, updated incrementally as stones are placed
+        self.zobrist = ZobristHasher(self.BOARD_SIZE)
+        self.state_key = 0
+        # Zobrist keys of the board in all 8 rotations/reflections, for canonicalizing agents.
+        # Only maintained once something asks for them (see get_symmetry_keys)
+        self.symmetry = BoardSymmetry(self.BOARD_SIZE)
+        self.symmetry_keys = [0] * 8
+        self.track_symmetry = False
+        
+        # Legal moves, kept up to date in O(1) per move instead of rescanning the board
+        self.reset_legal_moves()
+        # Empty cells near existing stones, for agents that prune their action set.
+        # Only maintained once something asks for them (see get_candidate_mask)
+        self.candidates = CandidateMoves(self.BOARD_SIZE, candidate_radius)
+        self.track_candidates = False
+        
+    def reset_legal_moves(self):
+        """Mark every cell empty in the legal-move mask and free-cell list."""
+        n_cells = self.BOARD_SIZE * self.BOARD_SIZE
+        self.legal_mask = np.ones(n_cells, dtype=bool)  # Flat mask of empty cells
+        self.free_cells = list(range(n_cells))  # Flat indices of empty cells, in no particular order
+        self.free_positions = list(range(n_cells))  # Cell -> its index in free_cells
+        
+    def remove_legal_move(self, cell):
+        """Drop a now-occupied flat cell index from the legal-move structures."""
+        self.legal_mask[cell] = False
+        # Swap the last free cell into this cell's slot so removal is O(1)
+        position = self.free_positions[cell]
+        last = self.free_cells.pop()
+        if last != cell:
+            self.free_cells[position] = last
+            self.free_positions[last] = position
         
     def reset(self):
         """Reset the game to initial state."""
@@ -37,8 +84,39 @@ class GomokuEnvironment:
         self.game_over = False
         self.winner = None
         self.move_count = 0
+        self.move_history = []
+        self.games_started += 1
+        self.state_key = 0
+        self.symmetry_keys = [0] * 8
+        self.reset_legal_moves()
+        self.candidates.reset()
+        if self.bitboard is not None:
+            self.bitboard.reset()
         return self.board
     
+    def get_symmetry_keys(self):
+        """
+        Return the 8 oriented Zobrist keys of the board. The first call computes
+        them from scratch and switches on their incremental upkeep in place_stone,
+        so environments without canonicalizing agents never pay for it.
+        """
+        if not self.track_symmetry:
+            self.symmetry_keys = self.symmetry.board_keys(self.board, self.zobrist)
+            self.track_symmetry = True
+        return self.symmetry_keys
+    
+    def get_candidate_mask(self):
+        """
+        Return the flat mask of candidate moves near existing stones. Like
+        get_symmetry_keys, the first call computes it from the board and switches
+        on its incremental upkeep in place_stone.
+        """
+        if not self.track_candidates:
+            self.candidates.mask = self.candidates.mask_for_board(self.board)
+            self.candidates.empty_board = self.move_count == 0
+            self.track_candidates = True
+        return self.candidates.mask
+    
     def place_stone(self, y, x):
         """
         Place a stone at (y,x) and return (reward, done).
@@ -56,19 +134,35 @@ class GomokuEnvironment:
             
             self.board[y][x] = self.current_player
             self.move_count += 1
+            self.move_history.append((y, x, self.current_player))
+            self.remove_legal_move(y * self.BOARD_SIZE + x)
+            if self.track_candidates:
+                self.candidates.place(y * self.BOARD_SIZE + x, self.legal_mask)
+            self.state_key = self.zobrist.toggle(self.state_key, y, x, self.current_player)
+            if self.track_symmetry:
+                self.symmetry_keys = self.symmetry.toggle_keys(
+                    self.symmetry_keys, y, x, self.current_player, self.zobrist)
+            if self.bitboard is not None:
+                self.bitboard.place(y, x, self.current_player)
             
             reward = 0.01  # Base reward for valid move
             
-            # Check for open 3-in-a-row first
-            if self.check_three_open(y, x):
+            if self.bitboard is not None:
+                # One pattern-table lookup per direction finds both the open 3 and the five
+                shapes = self.line_shapes(y, x)
+                open_three, five = shapes & OPEN_THREE, shapes & FIVE
+            else:
+                # On the array engine the early-exit scans read fewer cells than the 4 windows
+                open_three, five = self.check_three_open(y, x), self.check_win(y, x)
+            if open_three:
                 reward += 0.05  # Bonus for creating open 3
             
-            if self.check_win(y, x):
+            if five:
                 self.game_over = True
                 self.winner = self.current_player
                 # Override with win/loss rewards
                 reward = 1.0 if self.current_player == 1 else 0.0
-            elif np.all(self.board != 0):  # Board full
+            elif self.move_count == self.BOARD_SIZE * self.BOARD_SIZE:  # Board full
                 self.game_over = True
                 reward = 0.5  # Medium reward for draw
             else:
@@ -78,9 +172,19 @@ class GomokuEnvironment:
         
         return 0.0, self.game_over
     
+    def line_shapes(self, y, x):
+        """Shape flags (see patterns.py) of the lines through the stone at (y,x)."""
+        player = int(self.board[y][x])
+        if self.bitboard is not None:
+            return window_shapes(self.bitboard.line_windows(y, x, player))
+        return window_shapes(board_windows(self.board, y, x, player))
+    
     def check_three_open(self, y, x):
         """Check if the placed stone creates an open 3-in-a-row formation.
         Returns True if there's an open 3-in-a-row with no blocking stones on either end."""
+        if self.bitboard is not None:
+            return self.bitboard.check_three_open(y, x, int(self.board[y][x]))
+        
         directions = [
             [(0, 1), (0, -1)],  # Horizontal
             [(1, 0), (-1, 0)],   # Vertical
@@ -122,6 +226,9 @@ class GomokuEnvironment:
     
     def check_win(self, y, x):
         """Check if the last move at (y,x) caused a win."""
+        if self.bitboard is not None:
+            return self.bitboard.check_win(y, x, int(self.board[y][x]))
+        
         directions = [
             [(0, 1), (0, -1)],  # Horizontal
             [(1, 0), (-1, 0)],  # Vertical
@@ -150,31 +257,26 @@ class GomokuEnvironment:
     
     def get_available_moves(self):
         """Get all empty positions on the board."""
-        moves = []
-        for y in range(self.BOARD_SIZE):
-            for x in range(self.BOARD_SIZE):
-                if self.board[y][x] == 0:
-                    moves.append((y, x))
-        return moves
+        return [divmod(int(cell), self.BOARD_SIZE) for cell in np.flatnonzero(self.legal_mask)]
     
-    def render(self, screen):
-        """Render the game board and stones."""
-        # Fill background
-        screen.fill((255, 255, 255))
+    def draw_empty_board(self, surface):
+        """Draw the wooden board, grid lines and star points."""
+        import pygame  # Imported lazily so headless training never loads pygame
+        
         # Draw board
-        pygame.draw.rect(screen, self.BROWN, (0, 0, self.BOARD_WIDTH, self.BOARD_HEIGHT))
+        pygame.draw.rect(surface, self.BROWN, (0, 0, self.BOARD_WIDTH, self.BOARD_HEIGHT))
         
         # Draw grid lines
         for i in range(self.BOARD_SIZE):
             # Horizontal lines
             pygame.draw.line(
-                screen, self.BLACK,
+                surface, self.BLACK,
                 (self.MARGIN, self.MARGIN + i * self.GRID_SIZE),
                 (self.BOARD_WIDTH - self.MARGIN, self.MARGIN + i * self.GRID_SIZE), 2
             )
             # Vertical lines
             pygame.draw.line(
-                screen, self.BLACK,
+                surface, self.BLACK,
                 (self.MARGIN + i * self.GRID_SIZE, self.MARGIN),
                 (self.MARGIN + i * self.GRID_SIZE, self.BOARD_HEIGHT - self.MARGIN), 2
             )
@@ -184,25 +286,79 @@ class GomokuEnvironment:
         for y, x in star_points:
             center_x = self.MARGIN + x * self.GRID_SIZE
             center_y = self.MARGIN + y * self.GRID_SIZE
-            pygame.draw.circle(screen, self.BLACK, (center_x, center_y), 4)
-        
-        # Draw stones
-        for y in range(self.BOARD_SIZE):
-            for x in range(self.BOARD_SIZE):
-                if self.board[y][x] == 1:  # Black stone
-                    pygame.draw.circle(
-                        screen, self.BLACK,
-                        (self.MARGIN + x * self.GRID_SIZE, self.MARGIN + y * self.GRID_SIZE),
-                        self.STONE_RADIUS
-                    )
-                elif self.board[y][x] == 2:  # White stone
-                    pygame.draw.circle(
-                        screen, self.WHITE,
-                        (self.MARGIN + x * self.GRID_SIZE, self.MARGIN + y * self.GRID_SIZE),
-                        self.STONE_RADIUS
-                    )
-                    pygame.draw.circle(
-                        screen, self.BLACK,
-                        (self.MARGIN + x * self.GRID_SIZE, self.MARGIN + y * self.GRID_SIZE),
-                        self.STONE_RADIUS, 1  # Outline
-                    )
\ No newline at end of file
+            pygame.draw.circle(surface, self.BLACK, (center_x, center_y), 4)
+    
+    def get_background(self):
+        """Return the empty board, pre-rendered once into its own surface."""
+        import pygame
+        
+        if self.background is None:
+            self.background = pygame.Surface((self.BOARD_WIDTH, self.BOARD_HEIGHT))
+            self.draw_empty_board(self.background)
+            if pygame.display.get_surface():
+                self.background = self.background.convert()
+        return self.background
+    
+    def stone_rect(self, y, x):
+        """Screen rectangle covered by the stone at (y,x)."""
+        import pygame
+        
+        return pygame.Rect(
+            self.MARGIN + x * self.GRID_SIZE - self.STONE_RADIUS,
+            self.MARGIN + y * self.GRID_SIZE - self.STONE_RADIUS,
+            2 * self.STONE_RADIUS + 1, 2 * self.STONE_RADIUS + 1
+        )
+    
+    def draw_stone(self, surface, y, x, player):
+        """Draw a single black (1) or white (2) stone."""
+        import pygame
+        
+        center = (self.MARGIN + x * self.GRID_SIZE, self.MARGIN + y * self.GRID_SIZE)
+        if player == 1:  # Black stone
+            pygame.draw.circle(surface, self.BLACK, center, self.STONE_RADIUS)
+        elif player == 2:  # White stone
+            pygame.draw.circle(surface, self.WHITE, center, self.STONE_RADIUS)
+            pygame.draw.circle(surface, self.BLACK, center, self.STONE_RADIUS, 1)  # Outline
+    
+    def render(self, screen):
+        """Render the game board and stones."""
+        # Fill background
+        screen.fill((255, 255, 255))
+        screen.blit(self.get_background(), (0, 0))
+        
+        # Draw stones from the move history, which snapshot views keep without a board
+        for y, x, player in self.move_history:
+            self.draw_stone(screen, y, x, player)
+        
+        self.rendered_game = self.games_started
+        self.rendered_moves = len(self.move_history)
+    
+    def render_incremental(self, screen):
+        """
+        Draw only what changed since the last call and return the dirty rectangles
+        for pygame.display.update. The whole board is redrawn from the pre-rendered
+        background after a reset; otherwise only newly placed stones are drawn.
+        """
+        import pygame
+        
+        if self.rendered_game != self.games_started or self.rendered_moves > len(self.move_history):
+            screen.blit(self.get_background(), (0, 0))
+            for y, x, player in self.move_history:
+                self.draw_stone(screen, y, x, player)
+            self.rendered_game = self.games_started
+            self.rendered_moves = len(self.move_history)
+            return [pygame.Rect(0, 0, self.BOARD_WIDTH, self.BOARD_HEIGHT)]
+        
+        dirty = []
+        for y, x, player in self.move_history[self.rendered_moves:]:
+            self.draw_stone(screen, y, x, player)
+            dirty.append(self.stone_rect(y, x))
+        self.rendered_moves = len(self.move_history)
+        return dirty
+    
+    def restore_region(self, screen, rect):
+        """Repaint a board region from the background plus any stones overlapping it."""
+        screen.blit(self.get_background(), rect.topleft, rect)
+        for y, x, player in self.move_history[:self.rendered_moves]:
+            if rect.colliderect(self.stone_rect(y, x)):
+                self.draw_stone(screen, y, x, player)
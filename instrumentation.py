@@ -0,0 +1,142 @@
+import json
+import time
+
+
+class Instrumentation:
+    """
+    Per-phase timers, counters and gauges that can be switched on at runtime.
+    Timing works by replacing methods on specific instances with timed wrappers,
+    so while disabled nothing is wrapped and the hot paths run untouched.
+    Snapshots can be dumped as JSON lines to a log file every `dump_every`
+    seconds and summarised as short text lines for the info panel.
+    """
+
+    def __init__(self, log_path=None, dump_every=5.0):
+        self.log_path = log_path
+        self.dump_every = dump_every
+        self.enabled = False
+        self.targets = []  # (object, method name, phase, count_hits) to wrap while enabled
+        self.gauges = {}  # Name -> zero-argument callable read at snapshot time
+        self.reset()
+
+    def reset(self):
+        """Clear all timers and counters and start a new measurement window."""
+        self.timers = {}  # Phase -> [calls, total ns, max ns]
+        self.counters = {}
+        self.window_start = time.perf_counter()
+        self.last_dump = self.window_start
+
+    def add_target(self, obj, method, phase=None, count_hits=False):
+        """
+        Time obj.method under `phase` (default: the method name) while enabled.
+        With count_hits, also count '<phase>.hits' / '<phase>.misses' by whether
+        the call returned something other than None (e.g. Q-table lookups).
+        """
+        target = (obj, method, phase or method, count_hits)
+        self.targets.append(target)
+        if self.enabled:
+            self.wrap(*target)
+
+    def add_gauge(self, name, read):
+        self.gauges[name] = read
+
+    def hit_rate(self, phase):
+        """Fraction of counted calls of phase that were hits."""
+        hits = self.counters.get(f"{phase}.hits", 0)
+        total = hits + self.counters.get(f"{phase}.misses", 0)
+        return hits / total if total else 0.0
+
+    def wrap(self, obj, method, phase, count_hits=False):
+        original = getattr(obj, method)
+        timer = self.timers.setdefault(phase, [0, 0, 0])
+        clock = time.perf_counter_ns
+        hit_names = (f"{phase}.hits", f"{phase}.misses")
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                timer[0] += 1
+                timer[1] += elapsed
+                if elapsed > timer[2]:
+                    timer[2] = elapsed
+            if count_hits:
+                self.count(hit_names[result is None])
+            return result
+
+        setattr(obj, method, timed)  # Instance attribute shadows the class method
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.reset()
+        for target in self.targets:
+            self.wrap(*target)
+        self.enabled = True
+
+    def disable(self):
+        """Remove every wrapper, restoring the original methods."""
+        if not self.enabled:
+            return
+        for obj, method, _, _ in self.targets:
+            obj.__dict__.pop(method, None)
+        self.enabled = False
+        if self.log_path:
+            self.dump()
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def count(self, name, n=1):
+        """Bump a counter; callers should only do this while enabled."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """Timers (calls, totals, mean/max and share of wall time), counters and gauges."""
+        wall = time.perf_counter() - self.window_start
+        timers = {
+            phase: {
+                'calls': calls,
+                'total_ms': total / 1e6,
+                'mean_us': total / calls / 1e3 if calls else 0.0,
+                'max_us': longest / 1e3,
+                'share': total / 1e9 / wall if wall else 0.0,
+            }
+            for phase, (calls, total, longest) in self.timers.items()
+        }
+        return {
+            'time': time.time(),
+            'wall_s': wall,
+            'timers': timers,
+            'counters': dict(self.counters),
+            'gauges': {name: read() for name, read in self.gauges.items()},
+        }
+
+    def dump(self):
+        """Append the current snapshot to the log file as one JSON line."""
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+        self.last_dump = time.perf_counter()
+
+    def tick(self):
+        """Call once per loop iteration; dumps to the log file when a dump is due."""
+        if (self.enabled and self.log_path
+                and time.perf_counter() - self.last_dump >= self.dump_every):
+            self.dump()
+
+    def summary_lines(self):
+        """Short text lines for the info panel: one per timed phase, then the gauges."""
+        snapshot = self.snapshot()
+        lines = [
+            f"{phase}: {t['mean_us']:.0f} us x {t['calls']} ({t['share']:.0%})"
+            for phase, t in sorted(snapshot['timers'].items(), key=lambda item: -item[1]['total_ms'])
+        ]
+        for name, value in snapshot['gauges'].items():
+            lines.append(f"{name}: {value:.1%}" if isinstance(value, float) else f"{name}: {value}")
+        return lines
@@ -1,19 +1,79 @@
 import pygame
+import argparse
+import os
 import sys
-import time
 from gomoku import GomokuEnvironment
 from ai import QLearningAI
+from background import BackgroundTrainer, show_snapshot, take_snapshot
+from gamelog import GameLogWriter
+from instrumentation import Instrumentation
+from train import checkpoint_paths, finish_game, load_checkpoint, play_move, save_checkpoint
 from visualization import GomokuVisualization
 
 # Constants
 INFO_WIDTH = 600  # Width of the info panel
 
-def main():
+def quit_game(checkpoint, black_ai, white_ai, game_log=None, instruments=None, visualizer=None):
+    """Save the agents (if a checkpoint prefix was given), close the logs and exit."""
+    if instruments:
+        instruments.disable()  # Writes a final snapshot to the metrics log
+    if game_log:
+        game_log.close()
+    if visualizer:
+        visualizer.close()  # Flushes the streaming stats file
+    if checkpoint:
+        black_ai.reset()
+        white_ai.reset()
+        save_checkpoint(checkpoint, black_ai, white_ai)
+    pygame.quit()
+    sys.exit()
+
+def main(checkpoint=None, log_path=None, metrics_path=None, instrument=False, stats_path=None):
+    pygame.init()
+    
     # Initialize game components
-    env = GomokuEnvironment()
+    env = GomokuEnvironment(engine='bitboard')  # Owned by the training thread while it runs
+    view = GomokuEnvironment()  # Display-only copy of whatever game is being shown
     black_ai = QLearningAI(1)  # Player 1 (Black)
     white_ai = QLearningAI(2)  # Player 2 (White)
-    visualizer = GomokuVisualization(env, black_ai, white_ai)
+    if checkpoint and os.path.exists(checkpoint_paths(checkpoint)[0]):
+        load_checkpoint(checkpoint, black_ai, white_ai)  # Resume earlier learning
+    # Training finishes many games per frame, so refresh the charts at most once a second
+    visualizer = GomokuVisualization(view, black_ai, white_ai, stats_path=stats_path, chart_interval=1.0)
+    game_log = GameLogWriter(log_path) if log_path else None  # Every finished game's moves
+    
+    # Per-phase timers, toggled with the I key; nothing is wrapped while it is off
+    instruments = Instrumentation(metrics_path)
+    instruments.add_target(env, 'place_stone')
+    instruments.add_target(view, 'render_incremental', 'render')
+    instruments.add_target(visualizer, 'draw_info_panel')
+    for ai in (black_ai, white_ai):
+        instruments.add_target(ai, 'choose_action')
+        instruments.add_target(ai, 'learn')
+        instruments.add_target(ai, 'get_q_row', 'q_lookup', count_hits=True)
+    instruments.add_gauge('Q states', lambda: len(black_ai.q_table) + len(white_ai.q_table))
+    instruments.add_gauge('Q hit rate', lambda: instruments.hit_rate('q_lookup'))
+    if instrument:
+        instruments.enable()
+    
+    # Self-play runs at full speed in a background thread; this loop only observes it
+    trainer = BackgroundTrainer(env, black_ai, white_ai,
+                                on_game_end=game_log.record if game_log else None)
+    trainer.start()
+    
+    def end_human_game():
+        finish_game(env, black_ai, white_ai)
+        # Update stats and reset
+        visualizer.update_stats(env.winner, env.move_count)
+        if game_log:
+            game_log.record(env)
+        env.reset()
+        black_ai.reset()
+        white_ai.reset()
+    
+    def shutdown():
+        trainer.stop()
+        quit_game(checkpoint, black_ai, white_ai, game_log, instruments, visualizer)
     
     # Set up the display
     WINDOW_WIDTH = env.BOARD_WIDTH + INFO_WIDTH
@@ -23,118 +83,84 @@ def main():
     
     # Game variables
     ai_vs_ai = True  # Start in AI vs AI mode
-    auto_play_delay = 0.01  # seconds between AI moves
-    last_ai_move_time = 0
     clock = pygame.time.Clock()
+    last_status_text = None
     
     while True:
-        current_time = time.time()
-        
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                shutdown()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    ai_vs_ai = not ai_vs_ai  # Toggle AI vs AI mode
+                    # Toggle AI vs AI mode; human play uses the agents directly, so pause training
+                    ai_vs_ai = not ai_vs_ai
+                    if ai_vs_ai:
+                        trainer.resume()
+                    else:
+                        trainer.pause()
+                elif event.key == pygame.K_i:
+                    instruments.toggle()  # Toggle hot-path instrumentation
                 elif event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
+                    shutdown()
             elif event.type == pygame.MOUSEBUTTONDOWN and not ai_vs_ai:
-                if not env.game_over:
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
-                    if mouse_x < env.BOARD_WIDTH:  # Only process clicks on game board
-                        board_x = round((mouse_x - env.MARGIN) / env.GRID_SIZE)
-                        board_y = round((mouse_y - env.MARGIN) / env.GRID_SIZE)
-                        reward, done = env.place_stone(board_y, board_x)
-                        if done:
-                            if env.winner == 1:
-                                black_ai.wins += 1
-                                white_ai.losses += 1
-                                black_ai.learn(env.board, 1.0)  # Black wins
-                                white_ai.learn(env.board, 0.0)  # White loses
-                            elif env.winner == 2:
-                                white_ai.wins += 1
-                                black_ai.losses += 1
-                                white_ai.learn(env.board, 1.0)  # White wins
-                                black_ai.learn(env.board, 0.0)  # Black loses
-                            else:
-                                black_ai.draws += 1
-                                white_ai.draws += 1
-                                black_ai.learn(env.board, 0.5)  # Draw
-                                white_ai.learn(env.board, 0.5)  # Draw
-                            # Update stats and reset
-                            visualizer.update_stats(env.winner, env.move_count)
-                            env.reset()
-                            black_ai.reset()
-                            white_ai.reset()
-                elif env.game_over:
-                    env.reset()
-                    black_ai.reset()
-                    white_ai.reset()
-                    visualizer.update_stats(env.winner, env.move_count)
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                if mouse_x < env.BOARD_WIDTH:  # Only process clicks on game board
+                    board_x = round((mouse_x - env.MARGIN) / env.GRID_SIZE)
+                    board_y = round((mouse_y - env.MARGIN) / env.GRID_SIZE)
+                    moves_before = env.move_count
+                    reward, done = env.place_stone(board_y, board_x)
+                    if done:
+                        end_human_game()
+                    elif env.move_count > moves_before:
+                        # The current policy answers the human's move
+                        if play_move(env, black_ai, white_ai):
+                            end_human_game()
         
-        # AI vs AI mode
-        if ai_vs_ai and not env.game_over and current_time - last_ai_move_time > auto_play_delay:
-            if env.current_player == 1:
-                ai = black_ai
-                opponent_ai = white_ai
-            else:
-                ai = white_ai
-                opponent_ai = black_ai
-            
-            state_key = ai.get_state_key(env.board)
-            ai.last_state = state_key
-            move = ai.choose_action(env.board)
-            ai.last_action = move
-            
-            if move:
-                reward, done = env.place_stone(move[0], move[1])
-                if done:
-                    if env.winner == 1:
-                        black_ai.wins += 1
-                        white_ai.losses += 1
-                        black_ai.learn(env.board, 1.0)  # Black wins
-                        white_ai.learn(env.board, 0.0)  # White loses
-                    elif env.winner == 2:
-                        white_ai.wins += 1
-                        black_ai.losses += 1
-                        white_ai.learn(env.board, 1.0)  # White wins
-                        black_ai.learn(env.board, 0.0)  # Black loses
-                    else:
-                        black_ai.draws += 1
-                        white_ai.draws += 1
-                        black_ai.learn(env.board, 0.5)  # Draw
-                        white_ai.learn(env.board, 0.5)  # Draw
-                    # Update stats and reset
-                    visualizer.update_stats(env.winner, env.move_count)
-                    env.reset()
-                    black_ai.reset()
-                    white_ai.reset()
-                else:
-                    ai.learn(env.board, reward)  # Learn from intermediate move
-            
-            last_ai_move_time = current_time
+        # Fold games finished by the training thread into the stats
+        for winner, move_count in trainer.drain_finished_games():
+            visualizer.update_stats(winner, move_count)
+        
+        # Show the training thread's latest snapshot, or the human game while paused
+        show_snapshot(view, trainer.snapshot if ai_vs_ai else take_snapshot(env))
         
-        # Draw everything
-        env.render(screen)
-        visualizer.draw_info_panel(screen, INFO_WIDTH)
+        # Draw only what changed: new stones, the status line and the info panel
+        dirty_rects = view.render_incremental(screen)
+        extra_lines = instruments.summary_lines() if instruments.enabled else ()
+        dirty_rects.append(visualizer.draw_info_panel(screen, INFO_WIDTH, extra_lines))
         
         # Draw game status
         status_text = ""
-        if env.game_over:
-            if env.winner:
-                status_text = f"{'Black' if env.winner == 1 else 'White'} wins!"
+        if view.game_over:
+            if view.winner:
+                status_text = f"{'Black' if view.winner == 1 else 'White'} wins!"
             else:
                 status_text = "Draw!"
         else:
-            status_text = f"{'Black' if env.current_player == 1 else 'White'}'s turn (Move {env.move_count})"
+            status_text = f"{'Black' if view.current_player == 1 else 'White'}'s turn (Move {view.move_count})"
         
-        status_surface = visualizer.font.render(status_text, True, (0, 0, 255))
-        screen.blit(status_surface, (env.MARGIN, 10))
+        status_rect = pygame.Rect(0, 0, view.BOARD_WIDTH, 10 + visualizer.font.get_height())
+        if status_text != last_status_text or status_rect.collidelist(dirty_rects) != -1:
+            view.restore_region(screen, status_rect)
+            status_surface = visualizer.font.render(status_text, True, (0, 0, 255))
+            screen.blit(status_surface, (view.MARGIN, 10))
+            dirty_rects.append(status_rect)
+            last_status_text = status_text
         
-        pygame.display.flip()
+        pygame.display.update(dirty_rects)
+        instruments.tick()
         clock.tick(60)  # Cap at 60 FPS
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gomoku AI vs AI with learning visualization")
+    parser.add_argument('checkpoint', nargs='?', default=None,
+                        help="checkpoint prefix to resume from and save to on exit")
+    parser.add_argument('game_log', nargs='?', default=None,
+                        help="append every finished game to this game log file")
+    parser.add_argument('--metrics-log', default=None,
+                        help="append instrumentation snapshots (JSON lines) to this file")
+    parser.add_argument('--instrument', action='store_true',
+                        help="start with instrumentation on (toggle with the I key)")
+    parser.add_argument('--stats-path', default=None,
+                        help="append every game's result (game, winner, moves) to this CSV file")
+    args = parser.parse_args()
+    main(args.checkpoint, args.game_log, args.metrics_log, args.instrument, args.stats_path)
\ No newline at end of file
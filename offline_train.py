@@ -0,0 +1,91 @@
+import argparse
+import os
+import time
+from gomoku import GomokuEnvironment
+from ai import QLearningAI
+from gamelog import read_games
+from train import checkpoint_paths, finish_game, load_checkpoint, save_checkpoint
+
+
+def replay_game(env, black_ai, white_ai, cells):
+    """
+    Feed one logged game through the environment, letting each agent learn from
+    its own moves exactly as in live self-play. Returns (winner, move_count).
+    """
+    env.reset()
+    black_ai.reset()
+    white_ai.reset()
+    for cell in cells.tolist():
+        ai = black_ai if env.current_player == 1 else white_ai
+        move = divmod(cell, env.BOARD_SIZE)
+        ai.observe_action(env.board, move, env)
+        reward, done = env.place_stone(*move)
+        if done:
+            finish_game(env, black_ai, white_ai)
+            break
+        ai.learn(env.board, reward, env)  # Learn from intermediate move
+    return env.winner, env.move_count
+
+
+def train_from_logs(paths, black_ai, white_ai, epochs=1, engine='bitboard', report_every=10000):
+    """
+    Stream every game of the given log files through replay_game, `epochs` times.
+    Returns the number of games replayed.
+    """
+    env = GomokuEnvironment(engine=engine)
+    start_time = time.perf_counter()
+    games = 0
+    moves = 0
+    for _ in range(epochs):
+        for path in paths:
+            for cells, _ in read_games(path):
+                moves += replay_game(env, black_ai, white_ai, cells)[1]
+                games += 1
+                if report_every and games % report_every == 0:
+                    elapsed = time.perf_counter() - start_time
+                    print(f"Game {games}: {games / elapsed:.1f} games/s, {moves / elapsed:.0f} moves/s")
+
+    # Flush the last game's per-game tracking
+    black_ai.reset()
+    white_ai.reset()
+    elapsed = time.perf_counter() - start_time
+    print(f"Replayed {games} games ({moves} moves) in {elapsed:.1f}s: "
+          f"{games / max(elapsed, 1e-9):.1f} games/s, {moves / max(elapsed, 1e-9):.0f} moves/s")
+    return games
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train Gomoku agents offline from game logs")
+    parser.add_argument('logs', nargs='+', help="game log files written with --log")
+    parser.add_argument('--epochs', type=int, default=1, help="passes over the logs")
+    parser.add_argument('--checkpoint', default=None,
+                        help="checkpoint prefix; writes <prefix>.black and <prefix>.white")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from an existing checkpoint")
+    parser.add_argument('--engine', choices=['array', 'bitboard'], default='bitboard',
+                        help="board engine used for win/open-3 detection")
+    parser.add_argument('--symmetry', action='store_true',
+                        help="share Q-table rows between rotations/reflections of a board")
+    parser.add_argument('--replay-capacity', type=int, default=None,
+                        help="learn from a replay buffer of this many transitions at the end of each game")
+    parser.add_argument('--n-step', type=int, default=None,
+                        help="n-step return length for replay (default: full game return)")
+    parser.add_argument('--report-every', type=int, default=10000,
+                        help="print progress every N games (0 disables)")
+    args = parser.parse_args(argv)
+
+    black_ai, white_ai = (
+        QLearningAI(player, canonicalize=args.symmetry,
+                    replay_capacity=args.replay_capacity, n_step=args.n_step)
+        for player in (1, 2)
+    )
+    if args.resume and args.checkpoint and os.path.exists(checkpoint_paths(args.checkpoint)[0]):
+        load_checkpoint(args.checkpoint, black_ai, white_ai)
+    train_from_logs(args.logs, black_ai, white_ai, epochs=args.epochs, engine=args.engine,
+                    report_every=args.report_every)
+    if args.checkpoint:
+        save_checkpoint(args.checkpoint, black_ai, white_ai)
+
+
+if __name__ == "__main__":
+    main()
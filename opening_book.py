@@ -0,0 +1,208 @@
+import argparse
+import os
+import numpy as np
+from gamelog import read_games
+from symmetry import BoardSymmetry
+from zobrist import ZobristHasher
+
+# File layout: a 32-byte header, then n_positions sorted uint64 canonical position
+# keys, then (n_positions, moves_per_position) arrays of canonical move cells
+# (uint8, NO_MOVE when unused), visit counts (uint32) and scores (float32).
+MAGIC = b'GMOB'
+VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u4'),
+    ('n_positions', '<u8'),
+    ('moves_per_position', '<u4'),
+    ('max_plies', '<u4'),
+    ('board_size', '<u4'),
+    ('reserved', '<u4'),
+])
+NO_MOVE = 255
+
+
+class OpeningBook:
+    """
+    Best moves for the first max_plies plies, keyed by canonical (symmetry-folded)
+    Zobrist position key. Each position keeps up to moves_per_position moves in
+    its canonical frame, best first, with a count and a score (the mover's mean
+    result for books built from game logs, the Q-value for books built from a
+    Q-table). Lookups are a single dict access.
+    """
+
+    def __init__(self, max_plies, moves_per_position=3, board_size=15):
+        self.max_plies = max_plies
+        self.moves_per_position = moves_per_position
+        self.board_size = board_size
+        self.entries = {}  # Canonical key -> [(canonical cell, count, score), ...] best first
+        self.symmetry = BoardSymmetry(board_size)
+        self.hasher = ZobristHasher(board_size)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def canonical_key(self, board, env=None):
+        """(canonical key, symmetry index) of a board, using env's incremental keys if given."""
+        keys = env.get_symmetry_keys() if env is not None else self.symmetry.board_keys(board, self.hasher)
+        return BoardSymmetry.canonical(keys)
+
+    def lookup(self, board, env=None):
+        """Return the book's best (y, x) for the board, or None if the position isn't in the book."""
+        move_count = env.move_count if env is not None else int(np.count_nonzero(board))
+        if move_count >= self.max_plies:
+            return None
+        key, symmetry = self.canonical_key(board, env)
+        moves = self.entries.get(key)
+        if not moves:
+            return None
+        cell = int(self.symmetry.inverse_perms[symmetry][moves[0][0]])  # Back to the board's frame
+        return divmod(cell, self.board_size)
+
+    def set_moves(self, key, moves):
+        """Keep the best moves_per_position of (canonical cell, count, score) for a position."""
+        moves = sorted(moves, key=lambda move: (move[2], move[1]), reverse=True)
+        self.entries[key] = moves[:self.moves_per_position]
+
+    def save(self, path):
+        keys = np.array(sorted(self.entries), dtype=np.uint64)
+        shape = (len(keys), self.moves_per_position)
+        cells = np.full(shape, NO_MOVE, dtype=np.uint8)
+        counts = np.zeros(shape, dtype=np.uint32)
+        scores = np.zeros(shape, dtype=np.float32)
+        for i, key in enumerate(keys.tolist()):
+            for j, (cell, count, score) in enumerate(self.entries[key]):
+                cells[i, j], counts[i, j], scores[i, j] = cell, count, score
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['n_positions'] = len(keys)
+        header['moves_per_position'] = self.moves_per_position
+        header['max_plies'] = self.max_plies
+        header['board_size'] = self.board_size
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for array in (header, keys, cells, counts, scores):
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = np.frombuffer(f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)
+            if len(header) != 1 or header['magic'][0] != MAGIC:
+                raise ValueError(f"{path} is not an opening book")
+            if header['version'][0] != VERSION:
+                raise ValueError(f"Unsupported opening book version {header['version'][0]} in {path}")
+            n = int(header['n_positions'][0])
+            k = int(header['moves_per_position'][0])
+            keys = np.frombuffer(f.read(8 * n), dtype=np.uint64)
+            cells = np.frombuffer(f.read(n * k), dtype=np.uint8).reshape(n, k)
+            counts = np.frombuffer(f.read(4 * n * k), dtype=np.uint32).reshape(n, k)
+            scores = np.frombuffer(f.read(4 * n * k), dtype=np.float32).reshape(n, k)
+        book = cls(int(header['max_plies'][0]), k, int(header['board_size'][0]))
+        for key, row_cells, row_counts, row_scores in zip(keys.tolist(), cells.tolist(),
+                                                         counts.tolist(), scores.tolist()):
+            book.entries[key] = [(cell, count, score)
+                                 for cell, count, score in zip(row_cells, row_counts, row_scores)
+                                 if cell != NO_MOVE]
+        return book
+
+
+def build_from_logs(paths, max_plies=8, moves_per_position=3, min_games=5):
+    """
+    Build a book from game logs: for every position in the first max_plies plies,
+    the moves played from it ranked by the mover's mean result (win 1, draw 0.5,
+    loss 0), keeping moves seen in at least min_games games.
+    """
+    book = OpeningBook(max_plies, moves_per_position)
+    size = book.board_size
+    stats = {}  # Canonical key -> {canonical cell: [games, total score]}
+    for path in paths:
+        for cells, winner in read_games(path):
+            keys = [0] * 8
+            for ply, cell in enumerate(cells[:max_plies].tolist()):
+                player = 1 + ply % 2
+                key, symmetry = BoardSymmetry.canonical(keys)
+                move = int(book.symmetry.perms[symmetry][cell])
+                score = 0.5 if winner is None else float(winner == player)
+                move_stats = stats.setdefault(key, {}).setdefault(move, [0, 0.0])
+                move_stats[0] += 1
+                move_stats[1] += score
+                keys = book.symmetry.toggle_keys(keys, cell // size, cell % size, player, book.hasher)
+
+    for key, moves in stats.items():
+        kept = [(cell, games, total / games) for cell, (games, total) in moves.items()
+                if games >= min_games]
+        if kept:
+            book.set_moves(key, kept)
+    return book
+
+
+def build_from_q_tables(black_ai, white_ai, max_plies=8, moves_per_position=3):
+    """
+    Build a book from trained agents: starting from the empty board, follow each
+    side's moves_per_position highest-valued moves for max_plies plies and record
+    them (with their Q-values) for every position reached. Positions the mover's
+    Q-table has never seen are left out and not expanded.
+    """
+    book = OpeningBook(max_plies, moves_per_position)
+    size = book.board_size
+    frontier = [np.zeros((size, size))]
+    for ply in range(max_plies):
+        ai = black_ai if ply % 2 == 0 else white_ai
+        next_frontier = []
+        for board in frontier:
+            key, symmetry = book.canonical_key(board)
+            if key in book.entries:
+                continue  # Reached already through another move order or orientation
+            q_row = ai.get_q_row(ai.get_state_key(board))
+            if q_row is None:
+                continue
+            legal = np.asarray(board).ravel() == 0
+            values = np.where(legal, q_row, -np.inf)
+            best = np.argsort(-values, kind='stable')[:moves_per_position]
+            best = [int(c) for c in best if legal[c]]
+            perm = book.symmetry.perms[symmetry]
+            book.set_moves(key, [(int(perm[c]), 1, float(values[c])) for c in best])
+            for cell in best:
+                child = board.copy()
+                child[cell // size, cell % size] = ai.player
+                next_frontier.append(child)
+        frontier = next_frontier
+    return book
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book from game logs or Q-tables")
+    parser.add_argument('output', help="opening book file to write")
+    parser.add_argument('--logs', nargs='+', default=None, help="game log files to build from")
+    parser.add_argument('--checkpoint', default=None,
+                        help="Q-table checkpoint prefix to build from instead of logs")
+    parser.add_argument('--plies', type=int, default=8, help="plies covered by the book")
+    parser.add_argument('--moves', type=int, default=3, help="moves kept per position")
+    parser.add_argument('--min-games', type=int, default=5,
+                        help="games a move needs in the logs to be kept")
+    args = parser.parse_args(argv)
+
+    if args.logs:
+        book = build_from_logs(args.logs, args.plies, args.moves, args.min_games)
+    elif args.checkpoint:
+        from ai import QLearningAI
+        from checkpoint import FLAG_CANONICAL, read_header
+        from train import checkpoint_paths, load_checkpoint
+        canonical = bool(read_header(checkpoint_paths(args.checkpoint)[0])['flags'] & FLAG_CANONICAL)
+        black_ai = QLearningAI(1, canonicalize=canonical)
+        white_ai = QLearningAI(2, canonicalize=canonical)
+        load_checkpoint(args.checkpoint, black_ai, white_ai)
+        book = build_from_q_tables(black_ai, white_ai, args.plies, args.moves)
+    else:
+        parser.error("give --logs or --checkpoint")
+    book.save(args.output)
+    print(f"Opening book: {len(book)} positions over {args.plies} plies, "
+          f"{os.path.getsize(args.output)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+from gomoku import GomokuEnvironment
+from ai import QLearningAI
+from checkpoint import MappedQTable
+from train import checkpoint_paths, load_checkpoint, play_game, save_checkpoint
+
+
+class TrackingQTable(MappedQTable):
+    """MappedQTable that remembers which stored rows it handed out, so a worker can diff them."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.touched = set()
+
+    def get(self, key, default=None):
+        row = self.overlay.get(key)
+        if row is not None:
+            return row
+        i = self._find(key)
+        if i < 0:
+            return default
+        self.touched.add(i)
+        return self.rows[i]
+
+    def deltas(self):
+        """Return (keys, rows) of every change made since the file was mapped."""
+        original = MappedQTable(self.path).rows  # Fresh copy-on-write mapping = unmodified values
+        touched = np.fromiter(self.touched, dtype=np.intp, count=len(self.touched))
+        diff = np.asarray(self.rows[touched]) - np.asarray(original[touched])
+        changed = diff.any(axis=1)
+        keys = [self.state_keys[touched[changed]]]
+        rows = [diff[changed]]
+        if self.overlay:
+            keys.append(np.fromiter(self.overlay.keys(), dtype=np.uint64, count=len(self.overlay)))
+            rows.append(np.asarray(list(self.overlay.values()), dtype=np.float32))
+        return np.concatenate(keys), np.concatenate(rows).astype(np.float32)
+
+
+def make_agents(options, seed=None):
+    """Create the environment and black/white agents for the given training options."""
+    env = GomokuEnvironment(engine=options['engine'],
+                            candidate_radius=options['candidate_radius'] or 2)
+    black_ai = QLearningAI(1, seed=seed, canonicalize=options['canonicalize'],
+                           candidate_radius=options['candidate_radius'])
+    white_ai = QLearningAI(2, seed=None if seed is None else seed + 1,
+                           canonicalize=options['canonicalize'],
+                           candidate_radius=options['candidate_radius'])
+    return env, black_ai, white_ai
+
+
+def self_play_worker(task):
+    """
+    Worker process: map the round's shared checkpoint, play games against it and
+    return the Q-table changes plus results for both agents.
+    """
+    prefix, num_games, seed, options = task
+    env, black_ai, white_ai = make_agents(options, seed)
+    load_checkpoint(prefix, black_ai, white_ai)
+    for ai in (black_ai, white_ai):
+        ai.q_table = TrackingQTable(ai.q_table.path)
+        ai.wins = ai.losses = ai.draws = 0
+
+    moves = 0
+    for _ in range(num_games):
+        moves += play_game(env, black_ai, white_ai)[1]
+
+    return [
+        {
+            'deltas': ai.q_table.deltas(),
+            'exploration_rate': ai.exploration_rate,
+            'wins': ai.wins,
+            'losses': ai.losses,
+            'draws': ai.draws,
+        }
+        for ai in (black_ai, white_ai)
+    ] + [moves]
+
+
+def merge_results(ai, results):
+    """
+    Apply worker results to the master agent. A state changed by several workers
+    gets the average of their changes, so concurrent updates don't overshoot.
+    """
+    rate = ai.exploration_rate
+    if results:
+        keys = np.concatenate([r['deltas'][0] for r in results])
+        rows = np.concatenate([r['deltas'][1] for r in results])
+        unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        sums = np.zeros((len(unique_keys), rows.shape[1]), dtype=np.float32)
+        np.add.at(sums, inverse, rows)
+        sums /= counts[:, None]
+        for key, delta in zip(unique_keys.tolist(), sums):
+            q_row = ai.q_table.get(key)
+            if q_row is None:
+                ai.q_table[key] = delta
+            else:
+                q_row += delta
+
+    # Each worker decayed exploration from the same starting rate; chain their decay
+    for r in results:
+        ai.exploration_rate *= r['exploration_rate'] / rate
+        ai.wins += r['wins']
+        ai.losses += r['losses']
+        ai.draws += r['draws']
+    ai.exploration_rate = max(ai.min_exploration, ai.exploration_rate)
+
+
+def train_parallel(num_games, workers, games_per_round=None, seed=None, checkpoint=None,
+                   resume=False, report=True, options=None):
+    """
+    Self-play across worker processes with a merged Q-table.
+    Every round the master tables are checkpointed to a scratch directory; each
+    worker memory-maps them (sharing pages), plays its share of games and sends
+    back only the rows it changed, which are merged into the master tables.
+    Returns (black_ai, white_ai, games per second).
+    """
+    options = dict({'engine': 'bitboard', 'candidate_radius': None, 'canonicalize': False},
+                   **(options or {}))
+    games_per_round = games_per_round or 200 * workers
+    _, black_ai, white_ai = make_agents(options, seed)
+    if resume and checkpoint and os.path.exists(checkpoint_paths(checkpoint)[0]):
+        load_checkpoint(checkpoint, black_ai, white_ai)
+        # Master tables are written to every round, so keep them as plain dicts
+        black_ai.q_table = dict(black_ai.q_table.items())
+        white_ai.q_table = dict(white_ai.q_table.items())
+
+    start_time = time.perf_counter()
+    games_done = 0
+    total_moves = 0
+    with tempfile.TemporaryDirectory() as scratch, \
+            multiprocessing.get_context('fork').Pool(workers) as pool:
+        prefix = os.path.join(scratch, 'round')
+        round_number = 0
+        while games_done < num_games:
+            round_games = min(games_per_round, num_games - games_done)
+            save_checkpoint(prefix, black_ai, white_ai)
+            shares = [round_games // workers + (1 if w < round_games % workers else 0)
+                      for w in range(workers)]
+            tasks = [
+                (prefix, share, None if seed is None else seed + 2 * (round_number * workers + w), options)
+                for w, share in enumerate(shares) if share
+            ]
+            results = pool.map(self_play_worker, tasks)
+            merge_results(black_ai, [r[0] for r in results])
+            merge_results(white_ai, [r[1] for r in results])
+
+            games_done += round_games
+            total_moves += sum(r[2] for r in results)
+            round_number += 1
+            if report:
+                elapsed = time.perf_counter() - start_time
+                print(f"Round {round_number}: {games_done} games, "
+                      f"{games_done / elapsed:.1f} games/s, {total_moves / elapsed:.0f} moves/s, "
+                      f"Q-table {len(black_ai.q_table)} / {len(white_ai.q_table)} states")
+
+    elapsed = time.perf_counter() - start_time
+    if checkpoint:
+        save_checkpoint(checkpoint, black_ai, white_ai)
+    return black_ai, white_ai, games_done / max(elapsed, 1e-9)
+
+
+def measure_scaling(num_games, max_workers, seed=None, options=None):
+    """Run the same workload with 1, 2, 4, ... workers and print throughput scaling."""
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+
+    baseline = None
+    print(f"{'workers':>8} {'games/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for workers in counts:
+        _, _, rate = train_parallel(num_games, workers, seed=seed, report=False, options=options)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.1f} {rate / baseline:>7.2f}x {rate / baseline / workers:>10.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-process Gomoku self-play training")
+    parser.add_argument('--games', type=int, default=10000, help="number of self-play games")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--games-per-round', type=int, default=None,
+                        help="games played between Q-table merges (default 200 per worker)")
+    parser.add_argument('--seed', type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument('--checkpoint', default=None,
+                        help="checkpoint prefix; writes <prefix>.black and <prefix>.white")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from an existing checkpoint")
+    parser.add_argument('--engine', choices=['array', 'bitboard'], default='bitboard',
+                        help="board engine used for win/open-3 detection")
+    parser.add_argument('--symmetry', action='store_true',
+                        help="share Q-table rows between rotations/reflections of a board")
+    parser.add_argument('--candidate-radius', type=int, default=None,
+                        help="only consider empty cells within this distance of a stone")
+    parser.add_argument('--scaling', action='store_true',
+                        help="report throughput for 1, 2, 4, ... up to --workers processes")
+    args = parser.parse_args(argv)
+
+    options = {'engine': args.engine, 'candidate_radius': args.candidate_radius,
+               'canonicalize': args.symmetry}
+    if args.scaling:
+        measure_scaling(args.games, args.workers, seed=args.seed, options=options)
+    else:
+        train_parallel(args.games, args.workers, games_per_round=args.games_per_round,
+                       seed=args.seed, checkpoint=args.checkpoint, resume=args.resume,
+                       options=options)
+
+
+if __name__ == "__main__":
+    main()
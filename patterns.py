@@ -0,0 +1,145 @@
+import numpy as np
+
+# Line shapes a stone can be part of, as bit flags so one lookup reports all of them.
+# A run is the unbroken line of own stones through the stone; its ends are the cells
+# just past it, "open" when empty (an opponent stone or the board edge blocks them).
+FIVE = 1 << 0        # Run of five or more
+OPEN_FOUR = 1 << 1   # Run of exactly four, both ends open
+FOUR = 1 << 2        # One move from five otherwise: a closed run of four or a broken four (XX.XX)
+OPEN_THREE = 1 << 3  # Run of exactly three, both ends open
+THREE = 1 << 4       # Run of exactly three, one end open
+OPEN_TWO = 1 << 5    # Run of exactly two, both ends open
+TWO = 1 << 6         # Run of exactly two, one end open
+SHAPES = (FIVE, OPEN_FOUR, FOUR, OPEN_THREE, THREE, OPEN_TWO, TWO)
+SHAPE_NAMES = ('five', 'open_four', 'four', 'open_three', 'three', 'open_two', 'two')
+
+# A window is the 9 cells of a line centred on a stone (offsets -4..4), encoded as
+# two 9-bit masks: own stones and blocked cells (opponent stones or off the board).
+WINDOW = 9
+CENTER = 4
+# Board directions (dy, dx) in the same order and bit order as BitBoard lines
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (-1, 1))
+
+
+def classify_window(own, blocked):
+    """Shape flags of the stone at the centre of a window, which must be an own stone."""
+    def cell(i):
+        if i < 0 or i >= WINDOW or blocked >> i & 1:
+            return 'blocked'
+        return 'own' if own >> i & 1 else 'empty'
+
+    left = CENTER
+    while cell(left - 1) == 'own':
+        left -= 1
+    right = CENTER
+    while cell(right + 1) == 'own':
+        right += 1
+    run = right - left + 1
+    open_ends = (cell(left - 1) == 'empty') + (cell(right + 1) == 'empty')
+
+    shapes = 0
+    if run >= 5:
+        return FIVE
+    if run == 4 and open_ends == 2:
+        shapes |= OPEN_FOUR
+    # Any 5-cell segment through the centre with four own stones and one empty cell
+    for start in range(CENTER - 4, CENTER + 1):
+        segment = [cell(i) for i in range(start, start + 5)]
+        if segment.count('own') == 4 and segment.count('empty') == 1:
+            shapes |= FOUR
+    if shapes & OPEN_FOUR:
+        shapes &= ~FOUR
+    if run == 3:
+        shapes |= OPEN_THREE if open_ends == 2 else THREE if open_ends == 1 else 0
+    elif run == 2:
+        shapes |= OPEN_TWO if open_ends == 2 else TWO if open_ends == 1 else 0
+    return shapes
+
+
+def build_shape_table():
+    """
+    Shape flags for every window, indexed by own | blocked << 9.
+    Only the 3^8 windows with an own centre stone are filled in; the rest stay 0.
+    """
+    table = np.zeros(1 << (2 * WINDOW), dtype=np.uint8)
+    others = [i for i in range(WINDOW) if i != CENTER]
+    for code in range(3 ** len(others)):
+        own = 1 << CENTER
+        blocked = 0
+        for i in others:
+            code, state = divmod(code, 3)
+            if state == 1:
+                own |= 1 << i
+            elif state == 2:
+                blocked |= 1 << i
+        table[own | blocked << WINDOW] = classify_window(own, blocked)
+    return table
+
+
+SHAPE_TABLE = build_shape_table()
+SHAPE_BYTES = SHAPE_TABLE.tobytes()  # Indexing bytes gives plain ints, faster for single lookups
+
+
+def window_shapes(windows):
+    """OR of the shape flags of several (own, blocked) windows, one lookup each."""
+    shapes = 0
+    for own, blocked in windows:
+        shapes |= SHAPE_BYTES[own | blocked << WINDOW]
+    return shapes
+
+
+def board_windows(board, y, x, player):
+    """The 4 (own, blocked) windows around (y,x) read from a board array."""
+    size = board.shape[0]
+    windows = []
+    for dy, dx in DIRECTIONS:
+        own = blocked = 0
+        for i in range(WINDOW):
+            ny, nx = y + dy * (i - CENTER), x + dx * (i - CENTER)
+            if not (0 <= ny < size and 0 <= nx < size):
+                blocked |= 1 << i
+            elif board[ny][nx] == player:
+                own |= 1 << i
+            elif board[ny][nx] != 0:
+                blocked |= 1 << i
+        windows.append((own, blocked))
+    return windows
+
+
+class PatternFeatures:
+    """
+    Vectorized shape evaluation of every cell of a board at once: for each cell,
+    the shape flags a stone of the given player there would be part of, in each
+    of the 4 directions. Agents can use these as a cheap feature source.
+    """
+
+    def __init__(self, board_size=15):
+        self.board_size = board_size
+        padded = board_size + 2 * CENTER
+        # Flat indices into the padded board of each cell's 9-cell window per direction
+        ys, xs = np.divmod(np.arange(board_size * board_size), board_size)
+        offsets = np.arange(WINDOW) - CENTER
+        self.window_index = np.stack([
+            ((ys[:, None] + CENTER + dy * offsets) * padded + xs[:, None] + CENTER + dx * offsets)
+            for dy, dx in DIRECTIONS
+        ], axis=1)  # (cells, 4, 9)
+        self.bit_weights = (1 << np.arange(WINDOW)).astype(np.int64)
+        self.padded = np.full((padded, padded), -1, dtype=np.int8)  # -1 = off the board
+
+    def direction_shapes(self, board, player):
+        """(cells, 4) uint8 shape flags if player placed a stone on each cell (0 on occupied cells)."""
+        inner = slice(CENTER, CENTER + self.board_size)
+        self.padded[inner, inner] = board
+        windows = self.padded.ravel()[self.window_index]
+        own = (windows == player).astype(np.int64) @ self.bit_weights | (1 << CENTER)
+        blocked = ((windows != player) & (windows != 0)).astype(np.int64) @ self.bit_weights
+        blocked &= ~(1 << CENTER)
+        shapes = SHAPE_TABLE[own | blocked << WINDOW]
+        shapes[np.asarray(board).ravel() != 0] = 0
+        return shapes
+
+    def shape_counts(self, board, player):
+        """(cells, 7) counts of directions forming each shape in SHAPES, per cell."""
+        shapes = self.direction_shapes(board, player)
+        flags = np.array(SHAPES, dtype=np.uint8)
+        return (shapes[:, :, None] & flags != 0).sum(axis=1).astype(np.int8)
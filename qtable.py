@@ -0,0 +1,148 @@
+import random
+import sys
+from collections import OrderedDict
+import numpy as np
+
+DICT_ENTRY_BYTES = 64  # Rough per-entry cost of the hash table slot and bookkeeping
+EVICTION_POLICIES = ('lru', 'visits', 'magnitude')
+
+
+class BoundedQTable:
+    """
+    Dict-like Q-table (state key -> float32 action-value row) that stays within a
+    memory budget. Once full, inserting a state evicts another one:
+    - 'lru': the least recently used state
+    - 'visits': the least visited of a random sample of states
+    - 'magnitude': the state with the smallest largest |Q| in a random sample,
+      i.e. one whose values are still near zero and carry little information
+    Sampled policies follow the approximate-eviction approach of caches like
+    Redis, which keeps each eviction O(sample_size).
+    """
+
+    def __init__(self, max_bytes, n_actions=225, policy='lru', sample_size=16, seed=None,
+                 on_evict=None):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.policy = policy
+        self.n_actions = n_actions
+        self.sample_size = sample_size
+        self.rng = random.Random(seed)
+        self.on_evict = on_evict  # Called with each evicted key
+        self.entry_bytes = (sys.getsizeof(np.zeros(n_actions, dtype=np.float32))
+                            + sys.getsizeof(2**63) + DICT_ENTRY_BYTES)
+        if policy == 'visits':
+            self.entry_bytes += sys.getsizeof(2**20)
+        self.max_entries = max(1, int(max_bytes // self.entry_bytes))
+
+        self.rows = OrderedDict() if policy == 'lru' else {}
+        self.visits = {}  # Key -> visit count ('visits' policy only)
+        # Keys in a list with reverse positions, for O(1) random sampling and removal
+        self.key_list = []
+        self.key_positions = {}
+
+        self.pinned = set()  # Keys that must not be evicted, e.g. rows of an update in progress
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        row = self.rows.get(key)
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        if self.policy == 'lru':
+            self.rows.move_to_end(key)
+        elif self.policy == 'visits':
+            self.visits[key] += 1
+        return row
+
+    def __getitem__(self, key):
+        row = self.get(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def __setitem__(self, key, row):
+        if key in self.rows:
+            self.rows[key] = row
+            if self.policy == 'lru':
+                self.rows.move_to_end(key)
+            return
+        while len(self.rows) >= self.max_entries:
+            if not self.evict():
+                break  # Everything is pinned; go over budget until unpin()
+        self.rows[key] = row
+        if self.policy != 'lru':
+            self.key_positions[key] = len(self.key_list)
+            self.key_list.append(key)
+            if self.policy == 'visits':
+                self.visits[key] = 1
+
+    def pin(self, keys):
+        """Protect keys from eviction until unpin(), so rows held by a caller stay in the table."""
+        self.pinned.update(keys)
+
+    def unpin(self):
+        """Release pinned keys and evict back down to max_entries if pinning let the table overgrow."""
+        self.pinned.clear()
+        while len(self.rows) > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """Remove one unpinned state according to the eviction policy; False if there is none."""
+        if len(self.pinned) >= len(self.rows) and all(key in self.pinned for key in self.rows):
+            return False
+        if self.policy == 'lru':
+            key = next(key for key in self.rows if key not in self.pinned)  # Least recent first
+            del self.rows[key]
+        else:
+            sample = [self.key_list[self.rng.randrange(len(self.key_list))]
+                      for _ in range(min(self.sample_size, len(self.key_list)))]
+            sample = [key for key in sample if key not in self.pinned]
+            if not sample:
+                sample = [next(key for key in self.key_list if key not in self.pinned)]
+            if self.policy == 'visits':
+                key = min(sample, key=self.visits.__getitem__)
+                del self.visits[key]
+            else:
+                magnitudes = np.abs(np.stack([self.rows[k] for k in sample])).max(axis=1)
+                key = sample[int(magnitudes.argmin())]
+            del self.rows[key]
+            # Swap the last key into the evicted key's slot
+            position = self.key_positions.pop(key)
+            last = self.key_list.pop()
+            if last != key:
+                self.key_list[position] = last
+                self.key_positions[last] = position
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key)
+        return True
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def keys(self):
+        return self.rows.keys()
+
+    def values(self):
+        return self.rows.values()
+
+    def items(self):
+        return self.rows.items()
+
+    def metrics(self):
+        """Entries, estimated bytes, hit rate and eviction count."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.rows),
+            'max_entries': self.max_entries,
+            'bytes': len(self.rows) * self.entry_bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Preallocated ring buffer of n-step transitions for batched Q-learning.
+    Each transition stores the state key and action, the discounted n-step
+    return, the key and legal-move mask (bit-packed) of the state to bootstrap
+    from, the discount to apply to that state's value, whether the episode
+    ended before it (no bootstrap), and the state's orientation bits (for
+    canonicalizing agents' bookkeeping when a row has to be re-created).
+    """
+
+    def __init__(self, capacity, n_actions=225):
+        self.capacity = capacity
+        self.n_actions = n_actions
+        mask_bytes = (n_actions + 7) // 8
+        self.state_keys = np.zeros(capacity, dtype=np.uint64)
+        self.actions = np.zeros(capacity, dtype=np.int16)
+        self.returns = np.zeros(capacity, dtype=np.float32)
+        self.next_keys = np.zeros(capacity, dtype=np.uint64)
+        self.next_masks = np.zeros((capacity, mask_bytes), dtype=np.uint8)
+        self.discounts = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.orientations = np.zeros(capacity, dtype=np.uint8)
+        self.total = 0  # Transitions added over the buffer's lifetime
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def add_batch(self, state_keys, actions, returns, next_keys, next_masks, discounts, dones,
+                  orientations):
+        """Append several transitions at once, overwriting the oldest when full."""
+        slots = (self.total + np.arange(len(state_keys))) % self.capacity
+        self.state_keys[slots] = state_keys
+        self.actions[slots] = actions
+        self.returns[slots] = returns
+        self.next_keys[slots] = next_keys
+        self.next_masks[slots] = np.packbits(next_masks, axis=1)
+        self.discounts[slots] = discounts
+        self.dones[slots] = dones
+        self.orientations[slots] = orientations
+        self.total += len(state_keys)
+
+    def sample(self, batch_size, rng):
+        """Draw a uniform minibatch; returns the same fields add_batch takes, masks unpacked."""
+        slots = rng.integers(0, len(self), size=min(batch_size, len(self)))
+        next_masks = np.unpackbits(self.next_masks[slots], axis=1, count=self.n_actions).astype(bool)
+        return (self.state_keys[slots], self.actions[slots], self.returns[slots],
+                self.next_keys[slots], next_masks, self.discounts[slots], self.dones[slots],
+                self.orientations[slots])
+
+
+def n_step_returns(rewards, discount_factor, n_step=None):
+    """
+    Discounted n-step returns for one episode's rewards, computed backwards in one
+    sweep. With n_step=None every step gets the full return to the end of the game.
+    Returns (returns, bootstrap_offsets) where bootstrap_offsets[t] is the index of
+    the step whose value completes the return (or len(rewards) when it ends the game).
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    length = len(rewards)
+    n = length if n_step is None else n_step
+    returns = np.zeros(length)
+    discount = 1.0
+    for k in range(min(n, length)):
+        returns[:length - k] += discount * rewards[k:]
+        discount *= discount_factor
+    offsets = np.minimum(np.arange(length) + n, length)
+    return returns, offsets
@@ -0,0 +1,382 @@
+import argparse
+import time
+import numpy as np
+from bitboard import BitBoard
+from candidates import CandidateMoves
+from patterns import (CENTER, FIVE, FOUR, OPEN_FOUR, OPEN_THREE, OPEN_TWO, SHAPE_BYTES, THREE,
+                      TWO, WINDOW)
+from stats import RingBuffer
+from zobrist import ZobristHasher
+
+WIN_SCORE = 1_000_000
+MATE_SCORE = WIN_SCORE - 1000  # Scores beyond ±MATE_SCORE are forced wins/losses, WIN_SCORE - plies
+SHAPE_VALUES = ((FIVE, 100000), (OPEN_FOUR, 10000), (FOUR, 1000), (OPEN_THREE, 1000),
+                (THREE, 100), (OPEN_TWO, 100), (TWO, 10))
+# Threat value of every combination of shape flags in one direction
+FLAG_VALUES = [sum(value for flag, value in SHAPE_VALUES if flags & flag) for flags in range(128)]
+EXACT, LOWER, UPPER = 0, 1, 2  # Transposition table bound types
+
+
+def score_to_tt(score, ply):
+    """
+    Make a forced win/loss score relative to the node storing it, as
+    WIN_SCORE - plies from that node, so the entry stays right when the
+    position is reached at another ply (or on a later move).
+    """
+    if score > MATE_SCORE:
+        return score + ply
+    if score < -MATE_SCORE:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    """Inverse of score_to_tt for a node probed at ply."""
+    if score > MATE_SCORE:
+        return score - ply
+    if score < -MATE_SCORE:
+        return score + ply
+    return score
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time or node budget runs out."""
+
+
+class AlphaBetaAI:
+    """
+    Search-based player with the same choose_action/learn/reset interface as
+    QLearningAI. Runs iterative-deepening negamax with alpha-beta pruning under a
+    per-move time and/or node budget, keeping the best move of the deepest
+    completed iteration.
+    - Moves are the empty cells near stones, ordered by the threat (pattern
+      table shapes) they make for the side to move plus the one they block,
+      and only the best `beam_width` are searched.
+    - A Zobrist-keyed transposition table is kept across moves and games.
+    - An optional QLearningAI (non-canonical) adds its Q-values as ordering priors
+      for its own player's moves.
+    """
+
+    def __init__(self, player, time_limit=0.2, max_nodes=None, max_depth=10, radius=2,
+                 beam_width=12, q_prior=None, prior_weight=1000.0, tt_entries=1_000_000,
+                 history=1000, time_margin=0.005):
+        self.player = player
+        self.time_limit = time_limit
+        self.time_margin = time_margin  # Reserved for unwinding the search and picking the move
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.beam_width = beam_width
+        self.q_prior = q_prior if q_prior is not None and not q_prior.canonicalize else None
+        self.prior_weight = prior_weight
+        self.tt_entries = tt_entries
+
+        self.size = 15
+        self.bitboard = BitBoard(self.size)
+        self.hasher = ZobristHasher(self.size)
+        candidates = CandidateMoves(self.size, radius)
+        self.center = candidates.center
+        self.neighbourhoods = [n.tolist() for n in candidates.neighbourhoods]
+        self.tt = {}  # Zobrist key -> (depth, score, bound, best cell)
+
+        # Search position: flat cell contents, its key and stone counts near each cell
+        self.cells = [0] * (self.size * self.size)
+        self.key = 0
+        self.near = {}
+
+        # Same bookkeeping fields the training loop uses on QLearningAI
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.exploration_rate = 0.0
+        self.last_state = None
+        self.last_action = None
+
+        # Per-move search statistics
+        self.latencies = RingBuffer(history)
+        self.move_nodes = RingBuffer(history)
+        self.depths = RingBuffer(history, dtype=np.int16)
+        self.nodes = 0
+        self.deadline = None
+
+    def get_state_key(self, board, env=None):
+        if env is not None:
+            return env.state_key
+        return self.hasher.hash_board(board)
+
+    def learn(self, board, reward, env=None):
+        """Searching players don't learn from rewards."""
+
+    def reset(self):
+        self.last_state = None
+        self.last_action = None
+
+    def place(self, cell, player):
+        self.cells[cell] = player
+        self.bitboard.place(cell // self.size, cell % self.size, player)
+        self.key ^= self.hasher.keys[player][cell]
+        for c in self.neighbourhoods[cell]:
+            self.near[c] = self.near.get(c, 0) + 1
+
+    def remove(self, cell, player):
+        self.cells[cell] = 0
+        self.bitboard.remove(cell // self.size, cell % self.size, player)
+        self.key ^= self.hasher.keys[player][cell]
+        for c in self.neighbourhoods[cell]:
+            count = self.near[c] - 1
+            if count:
+                self.near[c] = count
+            else:
+                del self.near[c]
+
+    def load_position(self, board):
+        """Set the search position to a board array."""
+        self.cells = [0] * (self.size * self.size)
+        self.key = 0
+        self.near = {}
+        self.bitboard.reset()
+        flat = np.asarray(board).ravel()
+        for cell in np.flatnonzero(flat).tolist():
+            self.place(cell, int(flat[cell]))
+
+    def threat(self, cell, player):
+        """(value, shape flags) of the lines player would form with a stone on empty cell."""
+        value = 0
+        shapes = 0
+        for own, blocked in self.bitboard.line_windows(cell // self.size, cell % self.size, player):
+            flags = SHAPE_BYTES[own | 1 << CENTER | blocked << WINDOW]
+            value += FLAG_VALUES[flags]
+            shapes |= flags
+        return value, shapes
+
+    def ordered_moves(self, player):
+        """
+        Candidate moves for player, best first, as (score, cell) pairs, plus the
+        best attack and defence values and whether player can make five / must block five.
+        """
+        prior = None
+        if self.q_prior is not None and player == self.q_prior.player:
+            prior = self.q_prior.q_table.get(self.key)
+        moves = []
+        best_attack = best_defence = 0
+        win = None
+        blocks = []
+        for cell in self.near:
+            if self.cells[cell]:
+                continue
+            attack, attack_shapes = self.threat(cell, player)
+            defence, defence_shapes = self.threat(cell, 3 - player)
+            if attack_shapes & FIVE:
+                win = cell
+            if defence_shapes & FIVE:
+                blocks.append(cell)
+            score = attack + defence
+            if prior is not None:
+                score += self.prior_weight * float(prior[cell])
+            moves.append((score, cell))
+            best_attack = max(best_attack, attack)
+            best_defence = max(best_defence, defence)
+        moves.sort(reverse=True)
+        return moves, best_attack, best_defence, win, blocks
+
+    def negamax(self, depth, alpha, beta, player, ply):
+        """Score of the position for player (to move), searched depth plies deep."""
+        self.nodes += 1
+        self.check_budget()  # Every node: each one costs far more than the clock read
+
+        alpha_start = alpha
+        entry = self.tt.get(self.key)
+        tt_cell = None
+        if entry is not None:
+            tt_depth, tt_score, bound, tt_cell = entry
+            tt_score = score_from_tt(tt_score, ply)
+            if tt_depth >= depth:
+                if bound == EXACT:
+                    return tt_score
+                if bound == LOWER:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if alpha >= beta:
+                    return tt_score
+
+        moves, best_attack, best_defence, win, blocks = self.ordered_moves(player)
+        if win is not None:
+            return WIN_SCORE - ply
+        if not moves:
+            return 0  # Board full: draw
+        if depth == 0:
+            # The side to move plays its strongest threat before the opponent can
+            return best_attack - best_defence // 2
+        if blocks:
+            moves = [(0, cell) for cell in blocks]  # Must stop the opponent's five
+        else:
+            moves = moves[:self.beam_width]
+            if tt_cell is not None:
+                moves = [(0, tt_cell)] + [move for move in moves if move[1] != tt_cell]
+
+        best_score = -WIN_SCORE - 1
+        best_cell = None
+        for _, cell in moves:
+            self.place(cell, player)
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, 3 - player, ply + 1)
+            finally:
+                self.remove(cell, player)
+            if score > best_score:
+                best_score, best_cell = score, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if len(self.tt) >= self.tt_entries:
+            self.tt.clear()
+        bound = UPPER if best_score <= alpha_start else LOWER if best_score >= beta else EXACT
+        self.tt[self.key] = (depth, score_to_tt(best_score, ply), bound, best_cell)
+        return best_score
+
+    def check_budget(self):
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchTimeout
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+
+    def search_root(self, depth, player, first_cell):
+        """One iteration at the root; returns (best cell, score)."""
+        moves, _, _, win, blocks = self.ordered_moves(player)
+        if win is not None:
+            return win, WIN_SCORE
+        if not moves:
+            return None, 0
+        if blocks:
+            moves = [(0, cell) for cell in blocks]
+        else:
+            moves = moves[:self.beam_width]
+        # Search the previous iteration's best move first
+        moves.sort(key=lambda move: move[1] != first_cell)
+
+        alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        best_cell = moves[0][1]
+        for _, cell in moves:
+            self.check_budget()
+            self.place(cell, player)
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, 3 - player, 1)
+            finally:
+                self.remove(cell, player)
+            if score > alpha:
+                alpha, best_cell = score, cell
+        return best_cell, alpha
+
+    def choose_action(self, board, env=None):
+        """Search the position and return the chosen (y, x), or None on a full board."""
+        start = time.perf_counter()
+        if self.time_limit:
+            self.deadline = start + max(self.time_limit - self.time_margin, self.time_limit / 2)
+        else:
+            self.deadline = None
+        self.nodes = 0
+        self.load_position(board)
+        if 0 not in self.cells:
+            return None  # Board full
+        if not self.near:
+            if self.cells[self.center] == 0:
+                return divmod(self.center, self.size)  # Empty board: take the centre
+            return None
+
+        best_cell = None
+        depth_reached = 0
+        try:
+            for depth in range(1, self.max_depth + 1):
+                best_cell, score = self.search_root(depth, self.player, best_cell)
+                depth_reached = depth
+                if abs(score) >= WIN_SCORE - self.max_depth:
+                    break  # Forced win or loss found; deeper search won't change it
+        except SearchTimeout:
+            pass
+        if best_cell is None:
+            # Not even depth 1 finished: fall back to the best-ordered move
+            self.load_position(board)
+            moves = self.ordered_moves(self.player)[0]
+            if not moves:
+                return None
+            best_cell = moves[0][1]
+
+        elapsed = time.perf_counter() - start
+        self.latencies.append(elapsed)
+        self.move_nodes.append(self.nodes)
+        self.depths.append(depth_reached)
+        return divmod(best_cell, self.size)
+
+    def search_stats(self):
+        """Nodes per second, per-move latency and depth over the recent moves."""
+        latencies = self.latencies.values()
+        if not len(latencies):
+            return {'moves': 0}
+        return {
+            'moves': self.latencies.total,
+            'nps': float(self.move_nodes.values().sum() / max(latencies.sum(), 1e-9)),
+            'mean_latency_ms': float(latencies.mean() * 1000),
+            'p95_latency_ms': float(np.percentile(latencies, 95) * 1000),
+            'max_latency_ms': float(latencies.max() * 1000),
+            'mean_depth': float(self.depths.values().mean()),
+        }
+
+
+def main(argv=None):
+    from gomoku import GomokuEnvironment
+    from ai import QLearningAI
+    from train import load_checkpoint, play_game
+
+    parser = argparse.ArgumentParser(description="Play the alpha-beta player against a Q-learning agent")
+    parser.add_argument('--games', type=int, default=10, help="games to play (colours alternate)")
+    parser.add_argument('--time-limit', type=float, default=0.2, help="seconds per search move")
+    parser.add_argument('--max-nodes', type=int, default=None, help="node budget per search move")
+    parser.add_argument('--beam-width', type=int, default=12, help="moves searched per node")
+    parser.add_argument('--checkpoint', default=None,
+                        help="checkpoint prefix of the Q-learning opponent (default: untrained)")
+    parser.add_argument('--prior', action='store_true',
+                        help="also use the checkpoint's Q-values as move-ordering priors")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the Q-learning opponent")
+    args = parser.parse_args(argv)
+
+    env = GomokuEnvironment(engine='bitboard')
+    q_agents = [QLearningAI(1, seed=args.seed), QLearningAI(2, seed=args.seed)]
+    if args.checkpoint:
+        load_checkpoint(args.checkpoint, *q_agents)
+    for ai in q_agents:
+        ai.exploration_rate = 0.0
+    searchers = [
+        AlphaBetaAI(player, time_limit=args.time_limit, max_nodes=args.max_nodes,
+                    beam_width=args.beam_width,
+                    q_prior=q_agents[player - 1] if args.prior else None)
+        for player in (1, 2)
+    ]
+
+    search_wins = q_wins = draws = 0
+    for game in range(args.games):
+        search_player = 1 + game % 2
+        if search_player == 1:
+            winner, moves = play_game(env, searchers[0], q_agents[1])
+        else:
+            winner, moves = play_game(env, q_agents[0], searchers[1])
+        if winner == search_player:
+            search_wins += 1
+        elif winner:
+            q_wins += 1
+        else:
+            draws += 1
+        print(f"Game {game + 1}: search plays {'black' if search_player == 1 else 'white'}, "
+              f"winner {winner or 'draw'} after {moves} moves")
+
+    print(f"Search {search_wins} / Q-learning {q_wins} / draws {draws}")
+    for searcher in searchers:
+        stats = searcher.search_stats()
+        if stats['moves']:
+            print(f"{'Black' if searcher.player == 1 else 'White'} search: {stats['moves']} moves, "
+                  f"{stats['nps']:.0f} nodes/s, latency mean {stats['mean_latency_ms']:.1f} ms, "
+                  f"p95 {stats['p95_latency_ms']:.1f} ms, max {stats['max_latency_ms']:.1f} ms, "
+                  f"depth {stats['mean_depth']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
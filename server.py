@@ -0,0 +1,344 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import time
+import traceback
+import numpy as np
+from ai import QLearningAI
+from checkpoint import FLAG_CANONICAL, read_header
+from opening_book import OpeningBook
+from stats import RingBuffer
+from train import checkpoint_paths, load_checkpoint
+
+# Protocol: one JSON object per line in each direction.
+#   {"id": 7, "board": [[0, 1, ...], ...]}   board as 15 rows (or 225 cells), 0 empty, 1 black, 2 white;
+#                                           optional "player" (default: inferred from the stone counts)
+#   -> {"id": 7, "move": [y, x], "source": "book" | "q_table" | "unseen"}   (move is null on a full board)
+#   {"cmd": "metrics"} -> {"metrics": {...}}
+#   Malformed requests get {"id": ..., "error": "..."}.
+
+
+class MoveServer:
+    """
+    Serves greedy moves from a saved Q-table pair to many concurrent clients.
+    The checkpoint is loaded once (memory-mapped), and requests arriving within
+    `batch_window` seconds of each other are answered together: their Zobrist
+    keys (all 8 orientations when the checkpoint is canonical) are computed in
+    one vectorized pass and their masked argmaxes in another.
+    """
+
+    def __init__(self, checkpoint, opening_book=None, batch_window=0.0005, max_batch=256,
+                 history=100000):
+        canonical = bool(read_header(checkpoint_paths(checkpoint)[0])['flags'] & FLAG_CANONICAL)
+        self.agents = {player: QLearningAI(player, canonicalize=canonical) for player in (1, 2)}
+        load_checkpoint(checkpoint, self.agents[1], self.agents[2])
+        for ai in self.agents.values():
+            ai.exploration_rate = 0.0
+        self.canonical = canonical
+        self.book = OpeningBook.load(opening_book) if opening_book else None
+        self.hasher = self.agents[1].hasher
+        self.board_size = self.hasher.board_size
+        self.n_cells = self.board_size ** 2
+        self.perms = self.agents[1].symmetry.perms if canonical else None
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue = None  # Created on the serving event loop
+        self.connections = set()  # Client handler tasks, cancelled when serving stops
+        # Metrics
+        self.started_at = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.sources = {'book': 0, 'q_table': 0, 'unseen': 0}
+        self.latencies = RingBuffer(history)  # Seconds from request parsed to move computed
+        self.batch_sizes = RingBuffer(history, dtype=np.int32)
+
+    def parse_board(self, request):
+        """Return (flat int8 board, player to move) of a request, raising ValueError if malformed."""
+        values = np.asarray(request['board']).ravel()  # Left unconverted so out-of-range ints can't overflow
+        if (values.size != self.n_cells or values.dtype.kind not in 'iu'
+                or not np.isin(values, (0, 1, 2)).all()):
+            raise ValueError(f"board must hold {self.n_cells} cells of 0, 1 or 2")
+        cells = values.astype(np.int8)
+        player = request.get('player')
+        if player is None:
+            player = 1 if np.count_nonzero(cells == 1) == np.count_nonzero(cells == 2) else 2
+        if player not in (1, 2):
+            raise ValueError("player must be 1 or 2")
+        return cells, player
+
+    def choose_moves(self, boards, players):
+        """
+        Greedy (move, source) for each of a batch of flat boards, matching
+        QLearningAI.choose_action with exploration off.
+        """
+        cells = np.stack(boards).astype(np.intp)
+        n = len(cells)
+        if self.canonical:
+            # (batch, 8) oriented keys; the canonical one is the smallest
+            oriented = np.bitwise_xor.reduce(self.hasher.table[cells[:, None, :], self.perms[None]], axis=2)
+            symmetries = oriented.argmin(axis=1)
+            keys = oriented[np.arange(n), symmetries].tolist()
+        else:
+            keys = np.bitwise_xor.reduce(self.hasher.table[cells, np.arange(self.n_cells)], axis=1).tolist()
+            symmetries = None
+
+        legal = cells == 0
+        rows = np.zeros((n, self.n_cells), dtype=np.float32)
+        results = [None] * n
+        for i, (key, player) in enumerate(zip(keys, players)):
+            if not legal[i].any():
+                results[i] = (None, None)
+                continue
+            if self.book is not None:
+                move = self.book.lookup(cells[i].reshape(self.board_size, self.board_size))
+                if move is not None and legal[i, move[0] * self.board_size + move[1]]:
+                    results[i] = (move, 'book')
+                    continue
+            q_row = self.agents[player].q_table.get(key)
+            if q_row is None:
+                results[i] = (divmod(int(legal[i].argmax()), self.board_size), 'unseen')  # First empty cell
+            else:
+                rows[i] = q_row[self.perms[symmetries[i]]] if self.canonical else q_row
+                results[i] = (None, 'q_table')
+
+        best = np.where(legal, rows, -np.inf).argmax(axis=1)
+        return [(divmod(int(best[i]), self.board_size), source) if source == 'q_table' else (move, source)
+                for i, (move, source) in enumerate(results)]
+
+    async def batcher(self):
+        """Collect requests for up to batch_window seconds (or max_batch of them) and answer them together."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Whatever else arrived meanwhile joins without waiting
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            boards, players, futures, arrivals = zip(*batch)
+            try:
+                moves = self.choose_moves(boards, players)
+            except Exception as e:
+                # Fail this batch's requests but keep serving
+                traceback.print_exc()
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"move evaluation failed: {e}"))
+                continue
+            done = time.perf_counter()
+            for future, arrival, (move, source) in zip(futures, arrivals, moves):
+                self.latencies.append(done - arrival)
+                if source:
+                    self.sources[source] += 1
+                if not future.done():
+                    future.set_result((move, source))
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+
+    async def request_move(self, cells, player):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((cells, player, future, time.perf_counter()))
+        return await future
+
+    def metrics(self):
+        """Request counts, throughput, batch sizes and latency percentiles (in milliseconds)."""
+        elapsed = time.perf_counter() - self.started_at
+        metrics = {
+            'uptime_s': elapsed,
+            'requests': self.requests,
+            'requests_per_sec': self.requests / max(elapsed, 1e-9),
+            'batches': self.batches,
+            'mean_batch_size': float(self.batch_sizes.values().mean()) if self.batch_sizes else 0.0,
+            'max_batch_size': int(self.batch_sizes.values().max()) if self.batch_sizes else 0,
+            'sources': dict(self.sources),
+        }
+        if self.latencies:
+            p50, p95, p99 = np.percentile(self.latencies.values() * 1000, [50, 95, 99])
+            metrics.update(latency_p50_ms=float(p50), latency_p95_ms=float(p95),
+                           latency_p99_ms=float(p99))
+        return metrics
+
+    async def handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while line := await reader.readline():
+                request = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    if request.get('cmd') == 'metrics':
+                        response = {'metrics': self.metrics()}
+                    else:
+                        move, source = await self.request_move(*self.parse_board(request))
+                        response = {'id': request.get('id'), 'move': move, 'source': source}
+                except (ValueError, KeyError, TypeError, AttributeError, OverflowError, RuntimeError) as e:
+                    response = {'id': request.get('id') if isinstance(request, dict) else None,
+                                'error': str(e)}
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Client went away, or the server is shutting down
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def serve(self, unix_path=None, host='127.0.0.1', port=8765, ready=None):
+        """Serve until cancelled, on a Unix socket if unix_path is given, else on TCP host:port."""
+        self.queue = asyncio.Queue()
+        batcher = asyncio.create_task(self.batcher())
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        if ready:
+            ready()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in (batcher, *self.connections):
+                task.cancel()
+            await asyncio.gather(batcher, *self.connections, return_exceptions=True)
+
+
+class MoveClient:
+    """Blocking client for a MoveServer, e.g. for a GUI or an evaluation bot."""
+
+    def __init__(self, unix_path=None, host='127.0.0.1', port=8765):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.file = self.sock.makefile('rwb')
+        self.next_id = 0
+
+    def call(self, request):
+        self.file.write((json.dumps(request) + "\n").encode())
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    def request_move(self, board, player=None):
+        """Return the served (y, x) move for a board, or None if the board is full."""
+        self.next_id += 1
+        request = {'id': self.next_id, 'board': np.asarray(board, dtype=int).tolist()}
+        if player is not None:
+            request['player'] = player
+        move = self.call(request)['move']
+        return None if move is None else tuple(move)
+
+    def metrics(self):
+        return self.call({'cmd': 'metrics'})['metrics']
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+async def load_test(clients, games, unix_path=None, host='127.0.0.1', port=8765, opening_moves=2, seed=0):
+    """
+    Play `games` games on each of `clients` concurrent connections, both sides
+    asking the server for every move after a few random opening plies.
+    Returns (moves requested, seconds, server metrics).
+    """
+    from gomoku import GomokuEnvironment
+
+    async def connect():
+        if unix_path:
+            return await asyncio.open_unix_connection(unix_path)
+        return await asyncio.open_connection(host, port)
+
+    async def client(index):
+        reader, writer = await connect()
+        env = GomokuEnvironment(engine='bitboard')
+        rng = random.Random(seed + index)
+        moves = 0
+        for _ in range(games):
+            env.reset()
+            while not env.game_over:
+                if env.move_count < opening_moves:
+                    move = divmod(rng.choice(env.free_cells), env.BOARD_SIZE)
+                else:
+                    writer.write((json.dumps({'board': env.board.astype(int).tolist()}) + "\n").encode())
+                    await writer.drain()
+                    move = json.loads(await reader.readline())['move']
+                    moves += 1
+                    if move is None:
+                        break
+                env.place_stone(*move)
+        writer.close()
+        return moves
+
+    start = time.perf_counter()
+    moves = sum(await asyncio.gather(*(client(i) for i in range(clients))))
+    elapsed = time.perf_counter() - start
+    reader, writer = await connect()
+    writer.write(b'{"cmd": "metrics"}\n')
+    metrics = json.loads(await reader.readline())['metrics']
+    writer.close()
+    return moves, elapsed, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve moves from a trained Q-table to many clients")
+    parser.add_argument('checkpoint', help="checkpoint prefix to serve (prefix.black / prefix.white)")
+    parser.add_argument('--socket', default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--opening-book', default=None, help="opening book consulted before the Q-table")
+    parser.add_argument('--batch-window-ms', type=float, default=0.5,
+                        help="how long to gather concurrent requests into one batch")
+    parser.add_argument('--max-batch', type=int, default=256, help="largest batch evaluated at once")
+    parser.add_argument('--load-test', type=int, default=0, metavar='CLIENTS',
+                        help="instead of serving forever, play --games games on this many concurrent "
+                             "clients against an in-process server and print the metrics")
+    parser.add_argument('--games', type=int, default=20, help="games per client for --load-test")
+    args = parser.parse_args(argv)
+
+    server = MoveServer(args.checkpoint, opening_book=args.opening_book,
+                        batch_window=args.batch_window_ms / 1000, max_batch=args.max_batch)
+    address = dict(unix_path=args.socket, host=args.host, port=args.port)
+
+    async def run_load_test():
+        ready = asyncio.Event()
+        serving = asyncio.create_task(server.serve(**address, ready=ready.set))
+        await ready.wait()
+        try:
+            return await load_test(args.load_test, args.games, **address)
+        finally:
+            serving.cancel()
+            await asyncio.gather(serving, return_exceptions=True)
+
+    if args.load_test:
+        moves, elapsed, metrics = asyncio.run(run_load_test())
+        print(f"{moves} moves served to {args.load_test} clients in {elapsed:.1f}s "
+              f"({moves / max(elapsed, 1e-9):.0f} moves/s)")
+        print(json.dumps(metrics, indent=2))
+        return
+
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"Serving {args.checkpoint} on {where}")
+    try:
+        asyncio.run(server.serve(**address))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-size NumPy ring buffer holding the most recent `capacity` values.
+    Memory stays constant however many values are appended; `total` still
+    counts every append so callers can recover the index of each kept value.
+    """
+
+    def __init__(self, capacity, dtype=np.float64, shape=()):
+        self.capacity = capacity
+        self.data = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.total = 0  # Values appended over the buffer's lifetime
+
+    def append(self, value):
+        self.data[self.total % self.capacity] = value
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def __bool__(self):
+        return self.total > 0
+
+    def __getitem__(self, index):
+        return self.values()[index]
+
+    def values(self, total=None):
+        """Kept values, oldest first (as of `total` appends, default all so far)."""
+        total = self.total if total is None else total
+        if total <= self.capacity:
+            return self.data[:total]
+        start = total % self.capacity
+        return np.concatenate((self.data[start:], self.data[:start]))
+
+    def indices(self, start=1, total=None):
+        """Lifetime index of each kept value (counting from start), oldest first."""
+        total = self.total if total is None else total
+        return np.arange(total - min(total, self.capacity), total) + start
+
+    def downsample(self, max_points, start=1):
+        """Return (indices, values) thinned to at most max_points evenly spaced samples."""
+        total = self.total  # Read once, so a concurrent append can't make the two disagree
+        stride = max(1, -(-min(total, self.capacity) // max_points))
+        return self.indices(start, total)[::stride], self.values(total)[::stride]
+
+
+class DecimatingHistory:
+    """
+    Constant-memory history of a whole run for plotting. Samples are kept every
+    `stride` steps; when the buffer fills up, every other sample is dropped and
+    the stride doubles, so the curve always spans the full run.
+    """
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.samples = np.zeros((capacity, width), dtype=np.float64)
+        self.count = 0
+        self.stride = 1
+
+    def record(self, step, sample):
+        """Offer the sample for the given step; it is kept if step falls on the stride."""
+        if step % self.stride:
+            return
+        if self.count == self.capacity:
+            half = self.capacity // 2
+            self.steps[:half] = self.steps[0:self.capacity:2]
+            self.samples[:half] = self.samples[0:self.capacity:2]
+            self.count = half
+            self.stride *= 2
+            if step % self.stride:
+                return
+        self.steps[self.count] = step
+        self.samples[self.count] = sample
+        self.count += 1
+
+    def series(self, latest_step=None, latest_sample=None):
+        """Return (steps, samples), optionally ending with the current point even if off-stride."""
+        steps, samples = self.steps[:self.count], self.samples[:self.count]
+        if latest_step is not None and (not self.count or steps[-1] != latest_step):
+            steps = np.append(steps, latest_step)
+            samples = np.vstack((samples, latest_sample))
+        return steps, samples
+
+
+class GameStats:
+    """
+    Streaming game statistics with constant memory: running totals and mean
+    length over the whole run, win rates over a sliding window of recent games,
+    a decimated cumulative-wins history for plotting, and an optional CSV stream
+    of every game's result for offline analysis.
+    """
+
+    def __init__(self, window=100, history=500, stream_path=None, flush_every=100):
+        self.games_played = 0
+        self.black_wins = 0
+        self.white_wins = 0
+        self.draws = 0
+        self.total_length = 0
+        self.recent_results = RingBuffer(window, dtype=np.int8)  # 0 = draw, 1 = black, 2 = white
+        self.recent_lengths = RingBuffer(window, dtype=np.int16)
+        self.cumulative = DecimatingHistory(history, 3)  # Black wins, white wins, draws
+        self.cumulative.record(0, (0, 0, 0))
+
+        self.stream = open(stream_path, 'a') if stream_path else None
+        self.flush_every = flush_every
+
+    def record(self, winner, move_count):
+        """Add one finished game; winner is 1, 2 or None for a draw."""
+        self.games_played += 1
+        self.total_length += move_count
+        if winner == 1:
+            self.black_wins += 1
+        elif winner == 2:
+            self.white_wins += 1
+        else:
+            self.draws += 1
+        self.recent_results.append(winner or 0)
+        self.recent_lengths.append(move_count)
+        self.cumulative.record(self.games_played, self.counts())
+
+        if self.stream:
+            self.stream.write(f"{self.games_played},{winner or 0},{move_count}\n")
+            if self.games_played % self.flush_every == 0:
+                self.stream.flush()
+
+    def counts(self):
+        return self.black_wins, self.white_wins, self.draws
+
+    @property
+    def mean_length(self):
+        return self.total_length / self.games_played if self.games_played else 0.0
+
+    def recent_win_rates(self):
+        """(black, white, draw) rates over the recent-games window."""
+        results = self.recent_results.values()
+        if not len(results):
+            return 0.0, 0.0, 0.0
+        return tuple(float(np.mean(results == r)) for r in (1, 2, 0))
+
+    def cumulative_series(self):
+        """(game numbers, cumulative [black, white, draw] counts) for the win chart."""
+        return self.cumulative.series(self.games_played, self.counts())
+
+    def close(self):
+        """Flush and close the CSV stream, if any."""
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,57 @@
+import numpy as np
+
+# The 8 rotations/reflections of a square board, as (y, x) -> (y', x') for an n x n board
+TRANSFORMS = [
+    lambda y, x, n: (y, x),                  # Identity
+    lambda y, x, n: (x, n - 1 - y),          # Rotate 90°
+    lambda y, x, n: (n - 1 - y, n - 1 - x),  # Rotate 180°
+    lambda y, x, n: (n - 1 - x, y),          # Rotate 270°
+    lambda y, x, n: (y, n - 1 - x),          # Mirror left-right
+    lambda y, x, n: (n - 1 - y, x),          # Mirror top-bottom
+    lambda y, x, n: (x, y),                  # Transpose
+    lambda y, x, n: (n - 1 - x, n - 1 - y),  # Anti-transpose
+]
+
+
+class BoardSymmetry:
+    """
+    Maps boards, cells and Zobrist keys between the 8 dihedral orientations.
+    The canonical orientation of a board is the one with the smallest Zobrist key.
+    """
+
+    def __init__(self, board_size=15):
+        self.board_size = board_size
+        n_cells = board_size * board_size
+        # perms[k][c] = index of cell c after applying symmetry k
+        self.perms = np.array([
+            [y2 * board_size + x2
+             for y2, x2 in (t(y, x, board_size) for y in range(board_size) for x in range(board_size))]
+            for t in TRANSFORMS
+        ], dtype=np.intp)
+        self.inverse_perms = np.argsort(self.perms, axis=1)
+        # cell_images[c] = images of cell c under all 8 symmetries, as plain ints
+        self.cell_images = [tuple(int(v) for v in self.perms[:, c]) for c in range(n_cells)]
+
+    def toggle_keys(self, keys, y, x, player, hasher):
+        """Update the 8 oriented Zobrist keys for a stone placed or removed at (y,x)."""
+        player_keys = hasher.keys[player]
+        images = self.cell_images[y * self.board_size + x]
+        return [key ^ player_keys[image] for key, image in zip(keys, images)]
+
+    def board_keys(self, board, hasher):
+        """Compute the 8 oriented Zobrist keys of a board from scratch."""
+        cells = np.asarray(board).ravel().astype(np.intp)
+        return [int(k) for k in np.bitwise_xor.reduce(hasher.table[cells[None, :], self.perms], axis=1)]
+
+    @staticmethod
+    def canonical(keys):
+        """Return (canonical key, symmetry index) for a list of 8 oriented keys."""
+        symmetry = min(range(len(keys)), key=keys.__getitem__)
+        return keys[symmetry], symmetry
+
+    def to_canonical_board(self, board, symmetry):
+        """Return the flat board seen in the canonical frame of the given symmetry."""
+        flat = np.asarray(board).ravel()
+        canonical = np.empty_like(flat)
+        canonical[self.perms[symmetry]] = flat
+        return canonical
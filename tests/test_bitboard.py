@@ -0,0 +1,26 @@
+import random
+from gomoku import GomokuEnvironment
+
+
+def play_random_games(games, seed):
+    """Play the same seeded random games on both engines and compare every step."""
+    rng = random.Random(seed)
+    array_env = GomokuEnvironment(engine='array')
+    bitboard_env = GomokuEnvironment(engine='bitboard')
+    moves = 0
+    for _ in range(games):
+        array_env.reset()
+        bitboard_env.reset()
+        while not array_env.game_over:
+            y, x = divmod(rng.choice(array_env.free_cells), array_env.BOARD_SIZE)
+            assert array_env.place_stone(y, x) == bitboard_env.place_stone(y, x)
+            assert array_env.check_win(y, x) == bitboard_env.check_win(y, x)
+            assert array_env.check_three_open(y, x) == bitboard_env.check_three_open(y, x)
+            moves += 1
+        assert bitboard_env.game_over
+        assert array_env.winner == bitboard_env.winner
+    return moves
+
+
+def test_bitboard_matches_array_engine():
+    assert play_random_games(200, seed=0) > 0
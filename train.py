@@ -0,0 +1,248 @@
+import argparse
+import os
+import random
+import time
+import numpy as np
+from gomoku import GomokuEnvironment
+from ai import QLearningAI
+from approx_ai import ApproxQAI
+from checkpoint import BackgroundCheckpointer
+from gamelog import GameLogWriter
+from opening_book import OpeningBook
+
+
+def checkpoint_paths(prefix):
+    """Return the (black, white) checkpoint file paths for a checkpoint prefix."""
+    return f"{prefix}.black", f"{prefix}.white"
+
+
+def save_checkpoint(prefix, black_ai, white_ai):
+    """Write both agents' Q-tables next to each other under a common prefix."""
+    black_path, white_path = checkpoint_paths(prefix)
+    black_ai.save(black_path)
+    white_ai.save(white_path)
+
+
+def load_checkpoint(prefix, black_ai, white_ai):
+    """Restore both agents from a checkpoint prefix written by save_checkpoint."""
+    black_path, white_path = checkpoint_paths(prefix)
+    black_ai.load(black_path)
+    white_ai.load(white_path)
+
+
+def finish_game(env, black_ai, white_ai):
+    """Hand out the final win/loss/draw rewards once env.game_over is set."""
+    if env.winner == 1:
+        black_ai.wins += 1
+        white_ai.losses += 1
+        black_ai.learn(env.board, 1.0, env)  # Black wins
+        white_ai.learn(env.board, 0.0, env)  # White loses
+    elif env.winner == 2:
+        white_ai.wins += 1
+        black_ai.losses += 1
+        white_ai.learn(env.board, 1.0, env)  # White wins
+        black_ai.learn(env.board, 0.0, env)  # Black loses
+    else:
+        black_ai.draws += 1
+        white_ai.draws += 1
+        black_ai.learn(env.board, 0.5, env)  # Draw
+        white_ai.learn(env.board, 0.5, env)  # Draw
+
+
+def play_move(env, black_ai, white_ai):
+    """
+    Let the agent whose turn it is pick and play one move, then learn from it.
+    Returns True once the game is over.
+    """
+    ai = black_ai if env.current_player == 1 else white_ai
+
+    state_key = ai.get_state_key(env.board, env)
+    ai.last_state = state_key
+    move = ai.choose_action(env.board, env)
+    ai.last_action = move
+
+    if move:
+        reward, done = env.place_stone(move[0], move[1])
+        if done:
+            finish_game(env, black_ai, white_ai)
+        else:
+            ai.learn(env.board, reward, env)  # Learn from intermediate move
+
+    return env.game_over
+
+
+def play_game(env, black_ai, white_ai):
+    """Play one full self-play game and return (winner, move_count)."""
+    env.reset()
+    black_ai.reset()
+    white_ai.reset()
+    while not play_move(env, black_ai, white_ai):
+        pass
+    return env.winner, env.move_count
+
+
+def train(num_games, seed=None, checkpoint=None, checkpoint_every=0,
+          resume=False, report_every=100, engine='bitboard',
+          check_collisions=False, canonicalize=False, candidate_radius=None,
+          q_table_budget_mb=None, eviction='lru', replay_capacity=None, replay_batch_size=64,
+          replay_batches=4, n_step=None, log_path=None, agent='tabular', hidden=32,
+          opening_book=None):
+    """
+    Run headless self-play as fast as the CPU allows.
+    No pygame, font or matplotlib modules are imported on this path.
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    tabular_only = [name for name, value in (
+        ('check_collisions', check_collisions), ('canonicalize', canonicalize),
+        ('candidate_radius', candidate_radius), ('q_table_budget_mb', q_table_budget_mb),
+        ('replay_capacity', replay_capacity), ('opening_book', opening_book),
+    ) if value not in (None, False)]
+    if agent != 'tabular' and tabular_only:
+        raise ValueError(f"{', '.join(tabular_only)}: only supported with tabular agents")
+
+    env = GomokuEnvironment(engine=engine, candidate_radius=candidate_radius or 2)
+    book = OpeningBook.load(opening_book) if opening_book else None
+    if agent == 'tabular':
+        black_ai = QLearningAI(1, seed=seed, check_collisions=check_collisions,
+                               canonicalize=canonicalize, candidate_radius=candidate_radius,
+                               q_table_budget_mb=q_table_budget_mb, eviction=eviction,
+                               replay_capacity=replay_capacity, replay_batch_size=replay_batch_size,
+                               replay_batches=replay_batches, n_step=n_step, opening_book=book)
+        white_ai = QLearningAI(2, seed=None if seed is None else seed + 1,
+                               check_collisions=check_collisions, canonicalize=canonicalize,
+                               candidate_radius=candidate_radius,
+                               q_table_budget_mb=q_table_budget_mb, eviction=eviction,
+                               replay_capacity=replay_capacity, replay_batch_size=replay_batch_size,
+                               replay_batches=replay_batches, n_step=n_step, opening_book=book)
+    else:
+        # Function-approximation agents; a linear model, or an MLP with `hidden` units
+        black_ai, white_ai = (
+            ApproxQAI(player, seed=None if seed is None else seed + player - 1,
+                      hidden=hidden if agent == 'mlp' else 0, n_step=n_step)
+            for player in (1, 2)
+        )
+    if resume and checkpoint and os.path.exists(checkpoint_paths(checkpoint)[0]):
+        load_checkpoint(checkpoint, black_ai, white_ai)
+
+    checkpointer = BackgroundCheckpointer()  # Periodic checkpoints are written by a forked child
+    game_log = GameLogWriter(log_path) if log_path else None
+    start_time = time.perf_counter()
+    total_moves = 0
+    for game in range(1, num_games + 1):
+        _, move_count = play_game(env, black_ai, white_ai)
+        total_moves += move_count
+        if game_log:
+            game_log.record(env)
+
+        if checkpoint and checkpoint_every and game % checkpoint_every == 0:
+            if not checkpointer.start(lambda: save_checkpoint(checkpoint, black_ai, white_ai)):
+                print(f"Game {game}: previous checkpoint still being written, skipping")
+
+        if report_every and game % report_every == 0:
+            elapsed = time.perf_counter() - start_time
+            print(f"Game {game}: {game / elapsed:.1f} games/s, "
+                  f"{total_moves / elapsed:.0f} moves/s, "
+                  f"black {black_ai.wins} / white {white_ai.wins} / draws {black_ai.draws}, "
+                  f"exploration {black_ai.exploration_rate:.3f}")
+
+    # Flush the last game's per-game tracking before the final checkpoint
+    black_ai.reset()
+    white_ai.reset()
+    if game_log:
+        game_log.close()
+    checkpointer.wait()
+    if checkpoint:
+        save_checkpoint(checkpoint, black_ai, white_ai)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Played {num_games} games ({total_moves} moves) in {elapsed:.1f}s: "
+          f"{num_games / max(elapsed, 1e-9):.1f} games/s, "
+          f"{total_moves / max(elapsed, 1e-9):.0f} moves/s")
+    for name, ai in (('Black', black_ai), ('White', white_ai)):
+        if agent != 'tabular':
+            print(f"{name} model: mean loss over the last games {ai.losses_per_game.values().mean():.4f}")
+            continue
+        metrics = ai.q_table_metrics()
+        print(f"{name} Q-table: " + ", ".join(
+            f"{k} {v:.1%}" if k == 'hit_rate' else f"{k} {v}" for k, v in metrics.items()))
+        if book:
+            print(f"{name} opening book: {ai.book_hits} moves played from the book")
+    if canonicalize:
+        for name, ai in (('Black', black_ai), ('White', white_ai)):
+            savings = ai.symmetry_savings()
+            if savings is None:
+                print(f"{name} Q-table: symmetry savings unknown (rows without orientation records)")
+                continue
+            print(f"{name} Q-table: {savings['canonical_states']} canonical states cover "
+                  f"{savings['raw_states']} board orientations ({savings['ratio']:.2f}x smaller)")
+    if check_collisions:
+        print(f"Zobrist key collisions: {black_ai.hash_collisions + white_ai.hash_collisions}")
+    return black_ai, white_ai
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Gomoku self-play training")
+    parser.add_argument('--games', type=int, default=1000, help="number of self-play games")
+    parser.add_argument('--seed', type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument('--checkpoint', default=None,
+                        help="checkpoint prefix; writes <prefix>.black and <prefix>.white")
+    parser.add_argument('--checkpoint-every', type=int, default=0,
+                        help="also checkpoint every N games (0 = only at the end)")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from an existing checkpoint")
+    parser.add_argument('--engine', choices=['array', 'bitboard'], default='bitboard',
+                        help="board engine used for win/open-3 detection")
+    parser.add_argument('--check-collisions', action='store_true',
+                        help="verify that no two distinct boards share a state key")
+    parser.add_argument('--symmetry', action='store_true',
+                        help="share Q-table rows between rotations/reflections of a board")
+    parser.add_argument('--candidate-radius', type=int, default=None,
+                        help="only consider empty cells within this distance of a stone")
+    parser.add_argument('--q-table-budget-mb', type=float, default=None,
+                        help="cap each agent's Q-table at this many megabytes")
+    parser.add_argument('--eviction', choices=['lru', 'visits', 'magnitude'], default='lru',
+                        help="which states to evict once the Q-table budget is reached")
+    parser.add_argument('--replay-capacity', type=int, default=None,
+                        help="learn from a replay buffer of this many transitions at the end of each game")
+    parser.add_argument('--replay-batch-size', type=int, default=64,
+                        help="transitions per replay minibatch")
+    parser.add_argument('--replay-batches', type=int, default=4,
+                        help="replay minibatches applied after each game")
+    parser.add_argument('--n-step', type=int, default=None,
+                        help="n-step return length for replay (default: full game return)")
+    parser.add_argument('--agent', choices=['tabular', 'linear', 'mlp'], default='tabular',
+                        help="Q-table agent, or a linear / MLP function approximator over pattern features")
+    parser.add_argument('--hidden', type=int, default=32, help="hidden units of the --agent mlp model")
+    parser.add_argument('--log', default=None,
+                        help="append every game's moves to this game log file")
+    parser.add_argument('--opening-book', default=None,
+                        help="opening book file (see opening_book.py) consulted before the Q-table")
+    parser.add_argument('--report-every', type=int, default=100,
+                        help="print throughput every N games (0 = quiet)")
+    args = parser.parse_args(argv)
+    if args.agent != 'tabular':
+        tabular_only = [flag for flag, value in (
+            ('--symmetry', args.symmetry), ('--check-collisions', args.check_collisions),
+            ('--candidate-radius', args.candidate_radius),
+            ('--q-table-budget-mb', args.q_table_budget_mb),
+            ('--replay-capacity', args.replay_capacity), ('--opening-book', args.opening_book),
+        ) if value not in (None, False)]
+        if tabular_only:
+            parser.error(f"{', '.join(tabular_only)}: only supported with --agent tabular")
+
+    train(args.games, seed=args.seed, checkpoint=args.checkpoint,
+          checkpoint_every=args.checkpoint_every, resume=args.resume,
+          report_every=args.report_every, engine=args.engine,
+          check_collisions=args.check_collisions, canonicalize=args.symmetry,
+          candidate_radius=args.candidate_radius,
+          q_table_budget_mb=args.q_table_budget_mb, eviction=args.eviction,
+          replay_capacity=args.replay_capacity, replay_batch_size=args.replay_batch_size,
+          replay_batches=args.replay_batches, n_step=args.n_step, log_path=args.log,
+          agent=args.agent, hidden=args.hidden, opening_book=args.opening_book)
+
+
+if __name__ == "__main__":
+    main()
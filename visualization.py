@@ -1,29 +1,36 @@
+import time
 import pygame
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_agg import FigureCanvasAgg
-import numpy as np
+from stats import GameStats, RingBuffer
+
+MAX_PLOT_POINTS = 300  # Longer histories are thinned before plotting
 
 class GomokuVisualization:
-    def __init__(self, env, black_ai, white_ai):
+    def __init__(self, env, black_ai, white_ai, stats_path=None, chart_interval=0.0):
         self.env = env
         self.black_ai = black_ai
         self.white_ai = white_ai
         self.font = pygame.font.SysFont('Arial', 20)
         self.large_font = pygame.font.SysFont('Arial', 24)
         
-        # Tracking variables
+        # Tracking variables, bounded so memory stays flat over long runs
         self.games_played = 0
-        self.black_win_counts = [0]  # Start with 0 for game 0
-        self.white_win_counts = [0]  # Start with 0 for game 0
-        self.draw_counts = [0]       # Start with 0 for game 0
-        self.exploration_rates = []
-        self.game_numbers = []
-        self.game_lengths = []
+        self.stats = GameStats(stream_path=stats_path)  # Optionally streams every result to a CSV file
+        self.exploration_rates = RingBuffer(1000, shape=(2,))  # (black, white) per game
+        
+        # Persistent chart figures and their last rendered surfaces, keyed by chart name
+        self.charts = {}
+        self.chart_interval = chart_interval  # Minimum seconds between re-renders of a chart
     
-    def draw_info_panel(self, screen, info_width):
-        """Draw the right-side panel with learning statistics."""
+    def draw_info_panel(self, screen, info_width, extra_lines=()):
+        """
+        Draw the right-side panel with learning statistics and return the area it covers.
+        extra_lines (e.g. instrumentation readings) are listed under the statistics.
+        """
         # Panel background
-        pygame.draw.rect(screen, (240, 240, 240), (self.env.BOARD_WIDTH, 0, info_width, self.env.BOARD_HEIGHT))
+        panel_rect = pygame.Rect(self.env.BOARD_WIDTH, 0, info_width, self.env.BOARD_HEIGHT)
+        pygame.draw.rect(screen, (240, 240, 240), panel_rect)
         
         # Title
         title = self.large_font.render("Learning Progress", True, (0, 0, 0))
@@ -51,10 +58,13 @@ class GomokuVisualization:
             f"White: {self.white_ai.exploration_rate:.3f}",
         ]
         
-        # Right column: Avg Length
+        # Right column: Avg Length and recent win rates
+        recent_black, recent_white, _ = self.stats.recent_win_rates()
         right_stats = [
             f"Avg Length:",
-            f"{np.mean(self.game_lengths):.1f} moves" if self.game_lengths else "0 moves"
+            f"{self.stats.mean_length:.1f} moves",
+            f"Last {len(self.stats.recent_results)} games:",
+            f"B {recent_black:.0%} / W {recent_white:.0%}",
         ]
         
         # Draw left column stats
@@ -72,117 +82,144 @@ class GomokuVisualization:
             text = self.font.render(stat, True, (0, 0, 0))
             screen.blit(text, (column3_x, stats_y + i * line_height))
         
-        # Draw graphs below all columns
+        # Extra lines in two columns below the statistics
         max_lines = max(len(left_stats), len(middle_stats), len(right_stats))
+        extra_rows = (len(extra_lines) + 1) // 2
+        for i, line in enumerate(extra_lines):
+            text = self.font.render(line, True, (80, 80, 80))
+            x = column1_x if i < extra_rows else column1_x + (info_width - 40) // 2
+            screen.blit(text, (x, stats_y + (max_lines + i % extra_rows) * line_height))
+        max_lines += extra_rows
+        
+        # Draw graphs below all columns
         graph_height = (self.env.BOARD_HEIGHT - stats_y - 30 - max_lines*line_height) // 2
         self.draw_win_graph(screen, stats_y + max_lines*line_height + 20, info_width - 40, graph_height)
         self.draw_reward_graph(screen, stats_y + max_lines*line_height + 30 + graph_height, info_width - 40, graph_height)
+        return panel_rect
 
-    def draw_win_graph(self, screen, y_pos, width, height):
-        """Draw the cumulative wins graph."""
-        try:
-            fig = plt.figure(figsize=(width/100, height/100), dpi=100)
+    def get_chart_surface(self, name, data_key, width, height, setup, update):
+        """
+        Return the pygame surface for a chart, re-rendering it only when data_key changes
+        (and at most once every chart_interval seconds).
+        setup(ax) creates the chart's artists once; update(ax, artists) loads the current data.
+        """
+        chart = self.charts.get(name)
+        if chart is None or chart['size'] != (width, height):
+            fig = Figure(figsize=(width/100, height/100), dpi=100)
             ax = fig.add_subplot(111)
+            chart = self.charts[name] = {
+                'size': (width, height),
+                'fig': fig,
+                'canvas': FigureCanvasAgg(fig),
+                'ax': ax,
+                'artists': setup(ax),
+                'data_key': None,
+                'surface': None,
+                'rendered_at': 0.0,
+            }
+        
+        now = time.perf_counter()
+        if chart['data_key'] != data_key and (chart['surface'] is None
+                                              or now - chart['rendered_at'] >= self.chart_interval):
+            update(chart['ax'], chart['artists'])
+            chart['fig'].tight_layout(pad=1)
+            
+            # Convert to Pygame surface
+            canvas = chart['canvas']
+            canvas.draw()
+            raw_data = canvas.get_renderer().tostring_argb()
+            surface = pygame.image.fromstring(raw_data, canvas.get_width_height(), "ARGB")
+            # Match the display's pixel format once so per-frame blits are plain copies
+            chart['surface'] = surface.convert() if pygame.display.get_surface() else surface
+            chart['data_key'] = data_key
+            chart['rendered_at'] = now
+        
+        return chart['surface']
 
-            # Plot cumulative wins starting from game 0
-            games = range(0, len(self.black_win_counts))
-            ax.plot(games, self.black_win_counts, label='Black Wins', color='black', linewidth=1.5)
-            ax.plot(games, self.white_win_counts, label='White Wins', color='blue', linewidth=1.5)
-            ax.plot(games, self.draw_counts, label='Draws', color='gray', linewidth=1.5, linestyle='--')
-
+    def draw_win_graph(self, screen, y_pos, width, height):
+        """Draw the cumulative wins graph."""
+        def setup(ax):
+            black_line, = ax.plot([], [], label='Black Wins', color='black', linewidth=1.5)
+            white_line, = ax.plot([], [], label='White Wins', color='blue', linewidth=1.5)
+            draw_line, = ax.plot([], [], label='Draws', color='gray', linewidth=1.5, linestyle='--')
+            
             # Formatting
             ax.set_title('Cumulative Wins Over Games', fontsize=10)
             ax.set_xlabel('Game Number', fontsize=8)
             ax.set_ylabel('Count', fontsize=8)
-            ax.set_xlim(0, max(1, len(self.black_win_counts)-1))
-            ax.set_ylim(0, max(1, max(self.black_win_counts + self.white_win_counts + self.draw_counts)))
             ax.tick_params(axis='both', which='major', labelsize=8)
             ax.legend(loc='upper left', fontsize=8)
             ax.grid(True, linestyle='--', alpha=0.4)
-
-            plt.tight_layout(pad=1)
-
-            # Convert to Pygame surface
-            canvas = FigureCanvasAgg(fig)
-            canvas.draw()
-            renderer = canvas.get_renderer()
-            raw_data = renderer.tostring_argb()
-            size = canvas.get_width_height()
-            
-            graph_surf = pygame.image.fromstring(raw_data, size, "ARGB")
+            return black_line, white_line, draw_line
+        
+        def update(ax, lines):
+            # Plot cumulative wins starting from game 0, thinned to a constant number of points
+            games, counts = self.stats.cumulative_series()
+            for i, line in enumerate(lines):
+                line.set_data(games, counts[:, i])
+            ax.set_xlim(0, max(1, self.games_played))
+            ax.set_ylim(0, max(1, counts[-1].max()))
+        
+        try:
+            graph_surf = self.get_chart_surface('wins', self.games_played, width, height, setup, update)
             screen.blit(graph_surf, (self.env.BOARD_WIDTH + 20, y_pos))
-
-            plt.close(fig)
         except Exception as e:
             print(f"Error drawing win graph: {e}")
     
     def draw_reward_graph(self, screen, y_pos, width, height):
         """Draw the final rewards per game graph for both AIs."""
-        try:
-            fig = plt.figure(figsize=(width/100, height/100), dpi=100)
-            ax = fig.add_subplot(111)
-
-            # Plot final rewards from both AIs if they have data
-            if hasattr(self.black_ai, 'final_rewards') and self.black_ai.final_rewards:
-                games = range(1, len(self.black_ai.final_rewards)+1)
-                ax.plot(games, self.black_ai.final_rewards, 
-                    label='Black Rewards', color='black', linewidth=1.5, marker='o', markersize=3)
-
-            if hasattr(self.white_ai, 'final_rewards') and self.white_ai.final_rewards:
-                games = range(1, len(self.white_ai.final_rewards)+1)
-                ax.plot(games, self.white_ai.final_rewards, 
-                    label='White Rewards', color='blue', linewidth=1.5, marker='o', markersize=3)
-
+        black_r = self.black_ai.final_rewards
+        white_r = self.white_ai.final_rewards
+        
+        def setup(ax):
+            black_line, = ax.plot([], [], label='Black Rewards', color='black',
+                                  linewidth=1.5, marker='o', markersize=3)
+            white_line, = ax.plot([], [], label='White Rewards', color='blue',
+                                  linewidth=1.5, marker='o', markersize=3)
+            
             # Formatting
             ax.set_title('Final Rewards per Game', fontsize=10)
             ax.set_xlabel('Game Number', fontsize=8)
             ax.set_ylabel('Reward', fontsize=8)
+            ax.tick_params(axis='both', which='major', labelsize=8)
+            ax.legend(loc='upper right', fontsize=8)
+            ax.grid(True, linestyle='--', alpha=0.4)
+            return black_line, white_line
+        
+        def update(ax, lines):
+            # Plot the recent final rewards from both AIs
+            plotted = []
+            for line, rewards in zip(lines, (black_r, white_r)):
+                games, values = rewards.downsample(MAX_PLOT_POINTS)
+                line.set_data(games, values)
+                if len(games):
+                    plotted.append((games, values))
             
             # Set appropriate axis limits
-            black_r = getattr(self.black_ai, 'final_rewards', [])
-            white_r = getattr(self.white_ai, 'final_rewards', [])
-            all_r = black_r + white_r
-            
-            if all_r:
-                ax.set_xlim(1, max(len(black_r), len(white_r)))
-                ax.set_ylim(min(all_r) - 0.2, max(all_r) + 0.2)
+            if plotted:
+                first = min(games[0] for games, _ in plotted)
+                last = max(games[-1] for games, _ in plotted)
+                ax.set_xlim(first, max(first + 1, last))
+                ax.set_ylim(min(values.min() for _, values in plotted) - 0.2,
+                            max(values.max() for _, values in plotted) + 0.2)
             else:
                 ax.set_xlim(0, 10)
                 ax.set_ylim(0, 1.5)
-                
-            ax.tick_params(axis='both', which='major', labelsize=8)
-            ax.legend(loc='upper right', fontsize=8)
-            ax.grid(True, linestyle='--', alpha=0.4)
-
-            plt.tight_layout(pad=1)
-
-            # Convert to Pygame surface
-            canvas = FigureCanvasAgg(fig)
-            canvas.draw()
-            renderer = canvas.get_renderer()
-            raw_data = renderer.tostring_argb()
-            size = canvas.get_width_height()
-            
-            graph_surf = pygame.image.fromstring(raw_data, size, "ARGB")
+        
+        try:
+            # Agents record final rewards in reset(), just after update_stats, so key on their lengths
+            data_key = (black_r.total, white_r.total)
+            graph_surf = self.get_chart_surface('rewards', data_key, width, height, setup, update)
             screen.blit(graph_surf, (self.env.BOARD_WIDTH + 20, y_pos))
-
-            plt.close(fig)
         except Exception as e:
             print(f"Error drawing reward graph: {e}")
         
+    def close(self):
+        """Close the streaming stats file, if any."""
+        self.stats.close()
+        
     def update_stats(self, game_result, move_count):
         """Update statistics after each game."""
         self.games_played += 1
-        self.game_lengths.append(move_count)
-        self.game_numbers.append(self.games_played)
-        
-        # Update cumulative win counts
-        prev_black = self.black_win_counts[-1]
-        prev_white = self.white_win_counts[-1]
-        prev_draw = self.draw_counts[-1]
-        
-        self.black_win_counts.append(prev_black + (1 if game_result == 1 else 0))
-        self.white_win_counts.append(prev_white + (1 if game_result == 2 else 0))
-        self.draw_counts.append(prev_draw + (1 if game_result is None else 0))
-        
-        self.exploration_rates.append((self.black_ai.exploration_rate, self.white_ai.exploration_rate))
\ No newline at end of file
+        self.stats.record(game_result, move_count)
+        self.exploration_rates.append((self.black_ai.exploration_rate, self.white_ai.exploration_rate))
@@ -0,0 +1,31 @@
+import numpy as np
+
+# Fixed seed so every process (trainer, GUI, saved checkpoints) agrees on the keys
+ZOBRIST_SEED = 20240615
+
+
+class ZobristHasher:
+    """
+    Zobrist hashing for Gomoku boards.
+    Each (player, cell) pair gets a random 64-bit number; a board's key is the XOR
+    of the numbers of all its stones, so placing a stone updates a key in O(1).
+    """
+
+    def __init__(self, board_size=15, seed=ZOBRIST_SEED):
+        self.board_size = board_size
+        rng = np.random.default_rng(seed)
+        # Row 0 (empty cell) stays zero so hash_board can XOR over the whole board
+        self.table = np.zeros((3, board_size * board_size), dtype=np.uint64)
+        self.table[1:] = rng.integers(1, 2**64, size=(2, board_size * board_size),
+                                      dtype=np.uint64, endpoint=False)
+        # Plain ints are much faster than NumPy scalars for the per-move XOR
+        self.keys = [None] + [[int(v) for v in self.table[p]] for p in (1, 2)]
+
+    def toggle(self, key, y, x, player):
+        """Add or remove player's stone at (y,x) from key."""
+        return key ^ self.keys[player][y * self.board_size + x]
+
+    def hash_board(self, board):
+        """Compute the key of a whole board from scratch."""
+        cells = np.asarray(board).ravel().astype(np.intp)
+        return int(np.bitwise_xor.reduce(self.table[cells, np.arange(cells.size)]))